@@ -0,0 +1,280 @@
+"""Cache backend shared by all worker processes of one host.
+
+Entries live in a SQLite database in WAL mode, so readers never block the
+writer and every worker sees the same counters, generations and cached
+pages without an external cache server. Integers are stored as native
+SQLite integers, which makes ``incr`` a single atomic UPDATE; everything
+else is pickled. Expired rows are dropped lazily and, once the table grows
+past ``MAX_ENTRIES``, the least recently used ``1/CULL_FREQUENCY`` of it is
+evicted.
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache_backends.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY, value BLOB, expires REAL, accessed REAL'
+    ') WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_entry_accessed'
+    ' ON cache_entry (accessed)',
+    'CREATE INDEX IF NOT EXISTS cache_entry_expires'
+    ' ON cache_entry (expires)',
+)
+# Reads refresh the LRU clock of an entry at most this often, so a hot
+# key does not turn every get() into a write.
+TOUCH_INTERVAL = 30
+# set() checks the table size once per this many writes in a process.
+CULL_CHECK_EVERY = 64
+# SQLite's default limit on bound parameters is 999.
+CHUNK_SIZE = 500
+
+
+def _encode(value):
+    if type(value) is int:
+        return value
+    return sqlite3.Binary(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+
+
+def _decode(value):
+    if isinstance(value, int):
+        return value
+    return pickle.loads(value)
+
+
+def _chunks(items):
+    items = list(items)
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=10,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _write(self):
+        """Context manager for a write transaction."""
+        return _Transaction(self._connection())
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _live_rows(self, keys, now):
+        rows = {}
+        connection = self._connection()
+        for chunk in _chunks(keys):
+            placeholders = ', '.join('?' * len(chunk))
+            rows.update(
+                (key, (value, accessed)) for key, value, accessed in
+                connection.execute(
+                    f'SELECT key, value, accessed FROM cache_entry '
+                    f'WHERE key IN ({placeholders}) '
+                    f'AND (expires IS NULL OR expires > ?)',
+                    (*chunk, now)
+                )
+            )
+        stale = [key for key, (_, accessed) in rows.items()
+                 if accessed < now - TOUCH_INTERVAL]
+        if stale:
+            with self._write() as cursor:
+                cursor.executemany(
+                    'UPDATE cache_entry SET accessed = ? WHERE key = ?',
+                    [(now, key) for key in stale]
+                )
+        return {key: value for key, (value, _) in rows.items()}
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        rows = self._live_rows([key], time.time())
+        if key not in rows:
+            return default
+        return _decode(rows[key])
+
+    def get_many(self, keys, version=None):
+        mapping = {}
+        for key in keys:
+            made = self.make_key(key, version=version)
+            self.validate_key(made)
+            mapping[made] = key
+        rows = self._live_rows(mapping, time.time())
+        return {mapping[key]: _decode(value) for key, value in rows.items()}
+
+    def _store(self, cursor, rows, timeout):
+        now = time.time()
+        expires = self._expires(timeout)
+        cursor.executemany(
+            'INSERT OR REPLACE INTO cache_entry (key, value, expires, '
+            'accessed) VALUES (?, ?, ?, ?)',
+            [(key, _encode(value), expires, now) for key, value in rows]
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write() as cursor:
+            self._store(cursor, [(key, value)], timeout)
+        self._maybe_cull()
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = []
+        for key, value in data.items():
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            rows.append((key, value))
+        with self._write() as cursor:
+            self._store(cursor, rows, timeout)
+        self._maybe_cull()
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        with self._write() as cursor:
+            live = cursor.execute(
+                'SELECT 1 FROM cache_entry WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (key, time.time())
+            ).fetchone()
+            if live:
+                return False
+            self._store(cursor, [(key, value)], timeout)
+        self._maybe_cull()
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self._write() as cursor:
+            cursor.execute(
+                'UPDATE cache_entry SET expires = ?, accessed = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self._expires(timeout), now, key, now)
+            )
+            return cursor.rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        """Atomically add ``delta`` to a stored integer."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        now = time.time()
+        with self._write() as cursor:
+            cursor.execute(
+                'UPDATE cache_entry SET value = value + ?, accessed = ? '
+                "WHERE key = ? AND typeof(value) = 'integer' "
+                'AND (expires IS NULL OR expires > ?)',
+                (delta, now, key, now)
+            )
+            if cursor.rowcount != 1:
+                raise ValueError(f"Key '{key}' not found")
+            return cursor.execute(
+                'SELECT value FROM cache_entry WHERE key = ?', (key,)
+            ).fetchone()[0]
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._connection().execute(
+            'SELECT 1 FROM cache_entry WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)',
+            (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        made = []
+        for key in keys:
+            key = self.make_key(key, version=version)
+            self.validate_key(key)
+            made.append(key)
+        with self._write() as cursor:
+            for chunk in _chunks(made):
+                placeholders = ', '.join('?' * len(chunk))
+                cursor.execute(
+                    f'DELETE FROM cache_entry WHERE key IN ({placeholders})',
+                    chunk
+                )
+
+    def clear(self):
+        with self._write() as cursor:
+            cursor.execute('DELETE FROM cache_entry')
+
+    def _maybe_cull(self):
+        self._writes += 1
+        if self._writes % CULL_CHECK_EVERY == 0:
+            self.cull()
+
+    def cull(self):
+        """Drop expired entries, then the least recently used ones."""
+        with self._write() as cursor:
+            cursor.execute('DELETE FROM cache_entry WHERE expires <= ?',
+                           (time.time(),))
+            count = cursor.execute(
+                'SELECT COUNT(*) FROM cache_entry'
+            ).fetchone()[0]
+            if count <= self._max_entries:
+                return
+            if self._cull_frequency == 0:
+                cursor.execute('DELETE FROM cache_entry')
+                return
+            cursor.execute(
+                'DELETE FROM cache_entry WHERE key IN ('
+                ' SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+                (count // self._cull_frequency,)
+            )
+
+    def close(self, **kwargs):
+        # Connections are per thread and reused across requests on purpose.
+        pass
+
+
+class _Transaction:
+    """``BEGIN IMMEDIATE`` ... ``COMMIT``, rolled back on errors."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection.cursor()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.connection.execute('COMMIT')
+        else:
+            self.connection.execute('ROLLBACK')
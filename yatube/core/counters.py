@@ -0,0 +1,72 @@
+"""Cache-backed row counts for paginated querysets.
+
+Each count lives in the cache under a scope name. Model signals keep the
+cached value current with ``adjust``. A cold scope is first counted with
+a bounded query; a large one is then counted exactly by a single request
+(see core.singleflight), and the others report the bounded estimate as
+approximate until that count is cached.
+"""
+from django.conf import settings
+from django.core.cache import cache
+
+from core import singleflight
+
+
+COUNT_TIMEOUT = getattr(settings, 'COUNT_CACHE_TIMEOUT', 60 * 60)
+ESTIMATE_LIMIT = getattr(settings, 'COUNT_ESTIMATE_LIMIT', 1000)
+KEY_PREFIX = 'count:'
+
+
+def make_key(scope):
+    return KEY_PREFIX + scope
+
+
+class ScopedCount:
+    """Count of a queryset cached under ``scope``.
+
+    Calling the instance returns a ``(count, approximate)`` pair.
+    """
+
+    def __init__(self, scope, queryset):
+        self.scope = scope
+        self.queryset = queryset
+
+    def __call__(self):
+        key = make_key(self.scope)
+        count = cache.get(key)
+        if count is not None:
+            return count, False
+        # COUNT(*) over a LIMIT subquery: never reads more than
+        # ESTIMATE_LIMIT + 1 rows, however large the scope is.
+        count = self.queryset.order_by()[:ESTIMATE_LIMIT + 1].count()
+        if count > ESTIMATE_LIMIT:
+            if not singleflight.acquire(key):
+                return count, True
+            try:
+                count = self.queryset.order_by().count()
+            finally:
+                singleflight.release(key)
+        cache.add(key, count, COUNT_TIMEOUT)
+        return count, False
+
+
+class KnownCount:
+    """A count that is already at hand, e.g. a denormalized counter."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def __call__(self):
+        return self.value, False
+
+
+def adjust(scope, delta):
+    """Shift a cached count; cold scopes are left to the next count."""
+    try:
+        cache.incr(make_key(scope), delta)
+    except ValueError:
+        pass
+
+
+def forget(*scopes):
+    cache.delete_many([make_key(scope) for scope in scopes])
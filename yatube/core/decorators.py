@@ -0,0 +1,102 @@
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import condition
+
+from core import generations
+from core.singleflight import get_or_compute
+
+
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 60 * 60 * 6)
+# Only these query parameters change what a public page shows; the rest
+# are left out of the key so they cannot be used to flood the cache.
+PAGE_CACHE_PARAMS = ('page', 'cursor')
+
+
+def _is_cacheable(request, response):
+    return (response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED'))
+
+
+def cache_public_page(scopes, timeout=PAGE_CACHE_TIMEOUT):
+    """Cache whole responses of a view for anonymous visitors.
+
+    ``scopes`` receives the view's URL kwargs and returns the cache scopes
+    the page is built from, so a hit needs neither the ORM nor templates
+    and a change to any scope (see core.generations) purges the page.
+    Signed-in users, unsafe methods and responses that set cookies or
+    carry a CSRF token always go to the view. An expired page is rebuilt
+    by a single request (see core.singleflight).
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            vary_on = [request.path]
+            vary_on.extend(request.GET.get(name, '')
+                           for name in PAGE_CACHE_PARAMS)
+            key = generations.make_key('page', scopes(**kwargs), vary_on)
+
+            def render():
+                response = view(request, *args, **kwargs)
+                if _is_cacheable(request, response):
+                    patch_vary_headers(response, ('Cookie',))
+                return response
+
+            return get_or_compute(
+                key, render, timeout,
+                store=lambda response: _is_cacheable(request, response)
+            )
+        return wrapper
+    return decorator
+
+
+def generation_etag(scopes=None, viewer_scopes=None,
+                    params=PAGE_CACHE_PARAMS):
+    """Answer conditional GETs of a view from its scope generations.
+
+    The ETag digests the generations (see core.generations) of the scopes
+    ``scopes`` returns for the URL kwargs, plus those ``viewer_scopes``
+    returns for the signed-in user's id, together with the path, the query
+    parameters named in ``params``, the viewer and their session and CSRF
+    token. It costs a cache lookup
+    and no queries, so an unchanged page is answered with 304 before the
+    view runs.
+    """
+    def etag(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        page_scopes = list(scopes(**kwargs)) if scopes else []
+        viewer = ''
+        if request.user.is_authenticated:
+            viewer = request.user.pk
+            if viewer_scopes:
+                page_scopes.extend(viewer_scopes(viewer))
+        # Pages may embed a CSRF token, which changes when the viewer signs
+        # in again; a 304 would keep the stale one in their forms.
+        session = getattr(request, 'session', None)
+        vary_on = [request.path, viewer,
+                   session.session_key if session is not None else '',
+                   request.META.get('CSRF_COOKIE', '')]
+        vary_on.extend(request.GET.get(name, '') for name in params)
+        key = generations.make_key('etag', page_scopes, vary_on)
+        return key.rsplit(':', 1)[1]
+    return condition(etag_func=etag)
+
+
+def query_budget(queries):
+    """Declare the most SQL queries a view may run per request.
+
+    The budget must not depend on the amount of data shown; it is
+    enforced by core.middleware.QueryBudgetMiddleware in development and
+    by core.testing.QueryBudgetMixin in tests.
+    """
+    def decorator(view):
+        view.query_budget = queries
+        return view
+    return decorator
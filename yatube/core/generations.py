@@ -0,0 +1,55 @@
+"""Generation counters for cache invalidation.
+
+Every cache scope (the global feed, a group, an author, a post, a
+reader's follow feed) owns an integer generation stored in the cache.
+Keys built with ``make_key`` embed the current generations of their
+scopes, so bumping a generation invalidates every entry built from it in
+O(1); the orphaned entries simply age out. A generation that is missing
+from the cache restarts from the clock, so it never repeats a value an
+old entry could still be stored under.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+
+
+KEY_PREFIX = 'generation:'
+
+
+def _key(scope):
+    return KEY_PREFIX + scope
+
+
+def _fresh():
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    """Current generations of ``scopes``, in the same order."""
+    keys = [_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {key: _fresh() for key in keys if key not in found}
+    for key, value in missing.items():
+        if not cache.add(key, value, None):
+            found[key] = cache.get(key, value)
+    found = {**missing, **found}
+    return [found[key] for key in keys]
+
+
+def bump(*scopes):
+    """Invalidate every cache entry keyed on any of ``scopes``."""
+    for scope in scopes:
+        try:
+            cache.incr(_key(scope))
+        except ValueError:
+            cache.set(_key(scope), _fresh(), None)
+
+
+def make_key(name, scopes, vary_on=()):
+    """Cache key for ``name`` tied to the generations of ``scopes``."""
+    parts = [f'{scope}={generation}' for scope, generation
+             in zip(scopes, get_generations(scopes))]
+    parts.extend(str(value) for value in vary_on)
+    digest = hashlib.md5(':'.join(parts).encode()).hexdigest()
+    return f'gencache:{name}:{digest}'
@@ -0,0 +1,150 @@
+"""Validation and sanitizing of uploaded images.
+
+``inspect`` reads just enough of an upload to learn its format and
+dimensions, so oversized or decompression-bomb images are refused before
+any pixel is decoded (see core.uploads.ImageUploadHandler). Accepted
+images are re-encoded by ``strip_metadata`` to drop EXIF, XMP and
+comments; the decode runs on a small thread pool, so only a bounded
+number of images is ever held in memory at once. The same pass measures
+the image and renders its blurred placeholder (``ImageInfo``).
+"""
+import base64
+import io
+import warnings
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageFilter, ImageOps
+
+
+MAX_SIZE = getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 5 * 2 ** 20)
+MAX_PIXELS = getattr(settings, 'IMAGE_UPLOAD_MAX_PIXELS', 24_000_000)
+MAX_SIDE = getattr(settings, 'IMAGE_UPLOAD_MAX_SIDE', 10_000)
+FORMATS = getattr(settings, 'IMAGE_UPLOAD_FORMATS',
+                  ('JPEG', 'PNG', 'GIF', 'WEBP'))
+# Headers are looked for in this many leading bytes; JPEG metadata
+# segments before the frame header can take up a good part of it.
+HEADER_LIMIT = 256 * 2 ** 10
+WORKERS = getattr(settings, 'IMAGE_UPLOAD_WORKERS', 2)
+REENCODE_TIMEOUT = getattr(settings, 'IMAGE_UPLOAD_REENCODE_TIMEOUT', 10)
+# Image info that describes the pixels rather than their provenance.
+KEPT_INFO = ('icc_profile', 'transparency', 'duration', 'loop',
+             'background')
+# Longest side of the placeholder; a 16x7 JPEG is about 300 bytes.
+PLACEHOLDER_SIZE = 16
+PLACEHOLDER_QUALITY = 40
+# EXIF orientations that swap width and height.
+EXIF_ORIENTATION = 0x0112
+ROTATED = (5, 6, 7, 8)
+
+ImageInfo = namedtuple('ImageInfo', 'format width height placeholder')
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS,
+                               thread_name_prefix='image-reencode')
+
+
+class IncompleteHeader(Exception):
+    """More bytes are needed to read the image header."""
+
+
+def inspect(head, complete=False):
+    """Format and size of the image starting with ``head`` bytes.
+
+    Only the header is parsed. Raises ``IncompleteHeader`` when more bytes
+    are needed (never for a ``complete`` file) and ``ValidationError``
+    when the image is refused.
+    """
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with Image.open(io.BytesIO(head)) as image:
+                image_format, (width, height) = image.format, image.size
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise ValidationError('The image has too many pixels.',
+                              code='image_pixels')
+    except (OSError, SyntaxError, ValueError):
+        if not complete and len(head) < HEADER_LIMIT:
+            raise IncompleteHeader
+        raise ValidationError('Upload a valid image.', code='invalid_image')
+    check(image_format, width, height)
+    return image_format, width, height
+
+
+def check(image_format, width, height):
+    if image_format not in FORMATS:
+        raise ValidationError(
+            f'{image_format} images are not supported.', code='image_format'
+        )
+    if max(width, height) > MAX_SIDE or width * height > MAX_PIXELS:
+        raise ValidationError(
+            f'The image is too large: {width}x{height} pixels.',
+            code='image_pixels'
+        )
+
+
+def placeholder(image):
+    """Tiny blurred JPEG of ``image`` as a ``data:`` URI."""
+    image = image.convert('RGB')
+    image.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    image = image.filter(ImageFilter.GaussianBlur(1))
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=PLACEHOLDER_QUALITY, optimize=True)
+    encoded = base64.b64encode(output.getvalue()).decode()
+    return f'data:image/jpeg;base64,{encoded}'
+
+
+def describe(file):
+    """``ImageInfo`` of a stored image, decoding as little as possible."""
+    with Image.open(file) as image:
+        image_format = image.format
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION) in ROTATED:
+            width, height = height, width
+        # JPEGs are decoded at a fraction of their size when that suffices.
+        image.draft('RGB', (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+        image = ImageOps.exif_transpose(image)
+        return ImageInfo(image_format, width, height, placeholder(image))
+
+
+def _reencode(data):
+    with Image.open(io.BytesIO(data)) as image:
+        image_format = image.format
+        check(image_format, *image.size)
+        frames = getattr(image, 'n_frames', 1)
+        if frames == 1:
+            image = ImageOps.exif_transpose(image)
+        image.info = {key: value for key, value in image.info.items()
+                      if key in KEPT_INFO}
+        output = io.BytesIO()
+        options = {'save_all': True} if frames > 1 else {}
+        if image_format == 'JPEG':
+            options['quality'] = 95
+        image.save(output, image_format, **options)
+        info = ImageInfo(image_format, *image.size, placeholder(image))
+    return output.getvalue(), info
+
+
+def strip_metadata(upload):
+    """A copy of the uploaded image re-encoded without its metadata.
+
+    The copy carries the ``ImageInfo`` of the image as ``image_info``.
+    """
+    upload.seek(0)
+    future = _executor.submit(_reencode, upload.read())
+    try:
+        data, info = future.result(timeout=REENCODE_TIMEOUT)
+    except FutureTimeoutError:
+        # A job still queued behind busy workers is dropped; one already
+        # running cannot be stopped and finishes in the background.
+        future.cancel()
+        raise ValidationError('The image took too long to process.',
+                              code='image_timeout')
+    except (OSError, SyntaxError, ValueError):
+        raise ValidationError('Upload a valid image.', code='invalid_image')
+    upload = SimpleUploadedFile(upload.name, data, upload.content_type)
+    upload.image_info = info
+    return upload
@@ -0,0 +1,66 @@
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache_backends import SQLiteCache
+
+
+class Command(BaseCommand):
+    help = 'Compare cache backends on set, get, get_many and incr.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keys', type=int, default=1000,
+            help='Number of distinct keys per operation.'
+        )
+        parser.add_argument(
+            '--size', type=int, default=2048,
+            help='Size of every stored value in bytes.'
+        )
+
+    def handle(self, *args, keys, size, **options):
+        directory = tempfile.mkdtemp()
+        params = {'OPTIONS': {'MAX_ENTRIES': keys * 2}}
+        backends = (
+            ('locmem', LocMemCache('benchmark', params)),
+            ('filebased', FileBasedCache(f'{directory}/files', params)),
+            ('sqlite', SQLiteCache(f'{directory}/cache.sqlite3', params)),
+        )
+        names = [f'key{number}' for number in range(keys)]
+        value = 'x' * size
+        try:
+            self.stdout.write(
+                f'{"backend":<10} {"set":>9} {"get":>9} '
+                f'{"get_many":>9} {"incr":>9}   (µs per key)'
+            )
+            for label, cache in backends:
+                timings = self.run(cache, names, value)
+                self.stdout.write(f'{label:<10} ' + ' '.join(
+                    f'{seconds / keys * 1e6:>9.1f}' for seconds in timings
+                ))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def run(self, cache, names, value):
+        timings = []
+        start = time.perf_counter()
+        for name in names:
+            cache.set(name, value)
+        timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        for name in names:
+            cache.get(name)
+        timings.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        cache.get_many(names)
+        timings.append(time.perf_counter() - start)
+        cache.set('counter', 0)
+        start = time.perf_counter()
+        for _ in names:
+            cache.incr('counter')
+        timings.append(time.perf_counter() - start)
+        return timings
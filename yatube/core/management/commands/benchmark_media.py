@@ -0,0 +1,86 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from django.views.static import serve as static_serve
+
+from core import serving
+
+
+class Command(BaseCommand):
+    help = ('Compare media serving: django.views.static, core.serving '
+            'streamed through Python, and the sendfile path.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=20,
+            help='Size of the served image in MB.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Requests per variant.'
+        )
+
+    def handle(self, *args, size, repeat, **options):
+        directory = tempfile.mkdtemp()
+        with open(os.path.join(directory, 'large.jpg'), 'wb') as file:
+            file.write(os.urandom(size * 2 ** 20))
+        factory = RequestFactory()
+        half = size * 2 ** 19
+        variants = (
+            ('static.serve', lambda: static_serve(
+                factory.get('/'), 'large.jpg', directory
+            ), self.stream),
+            ('serving', lambda: serving.serve(
+                factory.get('/'), 'large.jpg', directory
+            ), self.stream),
+            ('serving range', lambda: serving.serve(
+                factory.get('/', HTTP_RANGE=f'bytes={half}-'),
+                'large.jpg', directory
+            ), self.stream),
+            ('serving sendfile', lambda: serving.serve(
+                factory.get('/'), 'large.jpg', directory
+            ), self.sendfile),
+            ('serving 304', lambda: serving.serve(
+                factory.get('/', HTTP_IF_NONE_MATCH='*'),
+                'large.jpg', directory
+            ), self.stream),
+        )
+        try:
+            with open(os.devnull, 'wb') as sink:
+                self.stdout.write(f'{"variant":<18} {"ms":>8} {"MB/s":>9}')
+                for label, request, send in variants:
+                    sent = 0
+                    start = time.perf_counter()
+                    for _ in range(repeat):
+                        sent += send(request(), sink)
+                    seconds = (time.perf_counter() - start) / repeat
+                    self.stdout.write(
+                        f'{label:<18} {seconds * 1e3:>8.2f} '
+                        f'{sent / repeat / 2 ** 20 / seconds:>9.0f}'
+                    )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def stream(self, response, sink):
+        # What a WSGI server without a sendfile file_wrapper does.
+        sent = 0
+        for chunk in getattr(response, 'streaming_content', ()):
+            sent += sink.write(chunk)
+        response.close()
+        return sent
+
+    def sendfile(self, response, sink):
+        # What gunicorn's file_wrapper does with response.file_to_stream.
+        file = response.file_to_stream
+        length = int(response['Content-Length'])
+        offset = file.tell()
+        sent = 0
+        while sent < length:
+            sent += os.sendfile(sink.fileno(), file.fileno(),
+                                offset + sent, length - sent)
+        response.close()
+        return sent
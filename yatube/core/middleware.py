@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryBudgetMiddleware:
+    """Fail requests whose view runs more queries than it declared.
+
+    Only active with ``DEBUG = True``; see core.decorators.query_budget.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get_response(request)
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None and len(queries) > budget:
+            statements = '\n'.join(query['sql'] for query in queries)
+            raise QueryBudgetExceeded(
+                f'{request.path} ran {len(queries)} queries, '
+                f'the budget is {budget}:\n{statements}'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = getattr(view_func, 'query_budget', None)
@@ -0,0 +1,251 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import (EmptyPage, InvalidPage, Page,
+                                   PageNotAnInteger, Paginator)
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+FORWARD = 'n'
+BACKWARD = 'p'
+LAST = 'l'
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class KeysetPaginator(Paginator):
+    """Paginator that seeks by the ordering key instead of OFFSET.
+
+    Pages opened through a cursor are read with a WHERE on the ordering
+    columns, so page 5000 costs the same as page 1. Plain page numbers
+    still work and fall back to the usual offset slicing.
+
+    ``count`` may be a callable returning ``(count, approximate)``. When
+    the count is approximate, pages past the estimate stay reachable and
+    ``num_pages`` grows with what the fetched rows prove to exist.
+
+    Pages carry ``elided_page_range``, a bounded window of page numbers
+    for navigation, so templates never loop over ``page_range``.
+    """
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, ordering=None, count=None,
+                 **kwargs):
+        self.count_provider = count
+        self.approximate = False
+        self._reached = 0
+        ordering = (ordering
+                    or object_list.query.order_by
+                    or object_list.model._meta.ordering)
+        self.ordering = tuple(ordering)
+        self.key_fields = [(name.lstrip('-'), name.startswith('-'))
+                           for name in self.ordering]
+        super().__init__(object_list.order_by(*self.ordering), per_page,
+                         **kwargs)
+
+    @cached_property
+    def count(self):
+        if self.count_provider is None:
+            return super().count
+        count, self.approximate = self.count_provider()
+        return count
+
+    @property
+    def num_pages(self):
+        pages = super().num_pages
+        if self.approximate:
+            return max(pages, self._reached)
+        return pages
+
+    def validate_number(self, number):
+        if not (self.count and self.approximate):
+            return super().validate_number(number)
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        self._note(number, rows)
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return self._get_page(rows[:self.per_page], number, self)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            # Only reachable past an approximate count.
+            return self._last_page()
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """Page numbers around ``number`` and at both ends, with
+        ``ELLIPSIS`` standing in for the skipped runs."""
+        number = max(int(number), 1)
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+    @property
+    def last_cursor(self):
+        return self.encode_cursor(0, LAST, ())
+
+    def get_cursor_page(self, cursor):
+        """Return the page addressed by an opaque cursor token."""
+        number, direction, key = self.decode_cursor(cursor)
+        if direction == LAST:
+            return self._last_page()
+        rows = list(self._seek(key, direction)[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == BACKWARD:
+            rows.reverse()
+            if not more:
+                # Nothing before this page: whatever the token said,
+                # this is the first one.
+                number = 1
+        else:
+            self._note(number, rows, more)
+        if not rows:
+            return self.get_page(number)
+        return self._get_page(rows, max(number, 1), self, cursor=cursor)
+
+    def seek(self, cursor=None):
+        """Rows from ``cursor`` on, with the page number and direction it
+        carries; nothing is counted.
+
+        Without a cursor the rows start at the top. Backward rows come in
+        reverse order. Last-page cursors need the count and are refused.
+        """
+        if not cursor:
+            return self.object_list, 1, FORWARD
+        number, direction, key = self.decode_cursor(cursor)
+        if direction == LAST:
+            raise InvalidCursor('That cursor needs the row count')
+        return self._seek(key, direction), number, direction
+
+    def cursor_after(self, number, obj):
+        """Cursor of the page after page ``number``, ending with ``obj``."""
+        return self.encode_cursor(number + 1, FORWARD, self._key(obj))
+
+    def cursor_before(self, number, obj):
+        """Cursor of the page before page ``number``, opening with ``obj``."""
+        return self.encode_cursor(number - 1, BACKWARD, self._key(obj))
+
+    def _get_page(self, object_list, number, paginator, cursor=''):
+        page = Page(list(object_list), number, paginator)
+        page.cursor = cursor
+        page.elided_page_range = list(self.get_elided_page_range(number))
+        page.next_cursor = page.previous_cursor = ''
+        if page.object_list:
+            first, last = page.object_list[0], page.object_list[-1]
+            page.next_cursor = self.cursor_after(number, last)
+            if number > 1:
+                page.previous_cursor = self.cursor_before(number, first)
+        return page
+
+    def _note(self, number, rows, more=None):
+        if more is None:
+            more = len(rows) > self.per_page
+        self._reached = max(self._reached, number + 1 if more else number)
+
+    def _last_page(self):
+        number = self.num_pages
+        size = self.count - (number - 1) * self.per_page
+        if self.approximate:
+            # The real tail is unknown: show the last full page of rows.
+            size = self.per_page
+        reverse = [self._flip(name) for name in self.ordering]
+        rows = list(self.object_list.order_by(*reverse)[:max(size, 0)])
+        rows.reverse()
+        return self._get_page(rows, number, self, cursor=self.last_cursor)
+
+    def _seek(self, key, direction):
+        condition = Q()
+        for position, (name, descending) in enumerate(self.key_fields):
+            before = descending == (direction == BACKWARD)
+            lookup = '{}__{}'.format(name, 'gt' if before else 'lt')
+            step = Q(**{lookup: key[position]})
+            for index, (equal_name, _) in enumerate(
+                    self.key_fields[:position]):
+                step &= Q(**{equal_name: key[index]})
+            condition |= step
+        queryset = self.object_list.filter(condition)
+        if direction == BACKWARD:
+            queryset = queryset.order_by(
+                *[self._flip(name) for name in self.ordering])
+        return queryset
+
+    @staticmethod
+    def _flip(name):
+        return name[1:] if name.startswith('-') else '-' + name
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            return [obj[name] for name, _ in self.key_fields]
+        return [getattr(obj, name) for name, _ in self.key_fields]
+
+    def _field(self, name):
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+        opts = self.object_list.model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def encode_cursor(self, number, direction, key):
+        values = []
+        for (name, _), value in zip(self.key_fields, key):
+            field = self._field(name)
+            holder = _Holder(field.attname, value)
+            values.append(field.value_to_string(holder))
+        payload = json.dumps([number, direction, values],
+                             separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            number, direction, values = json.loads(
+                base64.urlsafe_b64decode(padded.encode()))
+            number = int(number)
+            if direction not in (FORWARD, BACKWARD, LAST):
+                raise ValueError
+            if direction != LAST and len(values) != len(self.key_fields):
+                raise ValueError
+            key = [self._field(name).to_python(value)
+                   for (name, _), value in zip(self.key_fields, values)]
+        except (binascii.Error, TypeError, ValueError,
+                UnicodeDecodeError, ValidationError):
+            raise InvalidCursor('That cursor is not valid')
+        return number, direction, key
+
+
+class _Holder:
+    """Lets ``Field.value_to_string`` serialize a bare key value."""
+
+    def __init__(self, name, value):
+        setattr(self, name, value)
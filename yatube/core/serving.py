@@ -0,0 +1,164 @@
+"""Serving files from disk without a fronting web server.
+
+``serve`` answers conditional requests from a single ``stat()``, sends a
+single byte range when asked for one, and streams the file through
+``FileResponse``. WSGI servers that offer a ``wsgi.file_wrapper`` with
+``sendfile`` support (gunicorn, uWSGI) hand the open file to the kernel
+instead of copying it through Python. When a web server does sit in
+front, ``SENDFILE_HEADER`` delegates the transfer to it:
+
+* ``'X-Accel-Redirect'`` (nginx) points at ``SENDFILE_URL`` + the
+  absolute file path, for an ``internal`` location aliased to ``/``;
+* ``'X-Sendfile'`` (Apache mod_xsendfile, lighttpd) carries the
+  absolute file path.
+"""
+import mimetypes
+import os
+import re
+import stat
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+
+SENDFILE_HEADER = getattr(settings, 'SENDFILE_HEADER', None)
+SENDFILE_URL = getattr(settings, 'SENDFILE_URL', '/protected/')
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeFile:
+    """``length`` bytes of ``file`` from ``start`` on, as a file object.
+
+    ``fileno()`` is kept, so a sendfile-capable ``wsgi.file_wrapper``
+    still sends straight from the current offset up to Content-Length.
+    """
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+class MediaResponse(FileResponse):
+    # Fewer, larger reads where the file cannot be handed to sendfile.
+    block_size = 64 * 2 ** 10
+
+
+def parse_range(header, size):
+    """``(start, end)`` of a single byte range, inclusive.
+
+    ``None`` means the whole file should be sent: no header, or several
+    ranges, which need not be honoured. Raises ``ValueError`` when the
+    range lies outside the file.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        # bytes=-N: the last N bytes.
+        start, end = max(size - int(last), 0), size - 1
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        raise ValueError(header)
+    return start, end
+
+
+def _range_applies(request, etag, mtime):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == int(mtime)
+
+
+def _stat(document_root, path):
+    try:
+        fullpath = safe_join(document_root, path)
+        status = os.stat(fullpath)
+    except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+        raise Http404('File not found.')
+    if not stat.S_ISREG(status.st_mode):
+        raise Http404('File not found.')
+    return fullpath, status
+
+
+def _response(request, fullpath, size, byte_range, content_type):
+    if SENDFILE_HEADER:
+        # The web server sends the body and handles ranges itself.
+        response = HttpResponse(content_type=content_type)
+        if SENDFILE_HEADER == 'X-Accel-Redirect':
+            response[SENDFILE_HEADER] = quote(
+                SENDFILE_URL.rstrip('/') + fullpath
+            )
+        else:
+            response[SENDFILE_HEADER] = fullpath
+    elif request.method == 'HEAD':
+        response = HttpResponse(content_type=content_type)
+        response['Content-Length'] = size
+    elif byte_range:
+        start, end = byte_range
+        response = MediaResponse(
+            RangeFile(open(fullpath, 'rb'), start, end - start + 1),
+            status=206, content_type=content_type
+        )
+        response['Content-Length'] = end - start + 1
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    else:
+        response = MediaResponse(open(fullpath, 'rb'),
+                                 content_type=content_type)
+    return response
+
+
+def serve(request, path, document_root, cache_control=None):
+    """Serve ``path`` below ``document_root`` with conditional GET and
+    byte ranges."""
+    fullpath, status = _stat(document_root, path)
+    size, mtime = status.st_size, status.st_mtime
+    etag = f'"{status.st_mtime_ns:x}-{size:x}"'
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=int(mtime))
+    if response is not None:
+        response['ETag'] = etag
+        return response
+
+    byte_range = None
+    if _range_applies(request, etag, mtime):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    response = _response(request, fullpath, size, byte_range,
+                         content_type or 'application/octet-stream')
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(mtime)
+    if cache_control:
+        response['Cache-Control'] = cache_control
+    return response
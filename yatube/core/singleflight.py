@@ -0,0 +1,88 @@
+"""Single-flight recomputation of expensive cache entries.
+
+``get_or_compute`` stores a value together with the moment it goes stale
+and keeps it in the cache for a further ``grace`` seconds. Once stale, the
+first request takes a short-lived lock and recomputes the value while
+every other request keeps serving the stale copy, so an expiring feed
+fragment is rebuilt by one worker instead of all of them at once. A
+request that finds nothing at all waits briefly for the lock holder
+before falling back to computing the value itself.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+STALE_GRACE = getattr(settings, 'CACHE_STALE_GRACE', 60)
+LOCK_TIMEOUT = getattr(settings, 'CACHE_LOCK_TIMEOUT', 10)
+LOCK_WAIT = getattr(settings, 'CACHE_LOCK_WAIT', 2)
+POLL_INTERVAL = 0.05
+
+
+def _lock_key(key):
+    return f'lock:{key}'
+
+
+def acquire(key):
+    """Take the recompute lock of ``key``; False if a request holds it."""
+    return cache.add(_lock_key(key), 1, LOCK_TIMEOUT)
+
+
+def release(key):
+    cache.delete(_lock_key(key))
+
+
+def _store(key, value, timeout, grace):
+    if timeout is None:
+        cache.set(key, (value, None), None)
+    else:
+        cache.set(key, (value, time.time() + timeout), timeout + grace)
+
+
+def _compute(key, compute, timeout, grace, store):
+    try:
+        value = compute()
+        if store(value):
+            _store(key, value, timeout, grace)
+        return value
+    finally:
+        release(key)
+
+
+def _wait_for(key):
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry
+        if not cache.has_key(_lock_key(key)):
+            break
+    return None
+
+
+def get_or_compute(key, compute, timeout, grace=STALE_GRACE,
+                   store=lambda value: True):
+    """Cached value of ``key``, computed by at most one request at a time.
+
+    ``compute`` builds the value on a miss; ``store`` decides whether a
+    freshly computed value may be cached at all.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        value, stale_at = entry
+        if stale_at is None or time.time() < stale_at:
+            return value
+        if not acquire(key):
+            return value
+        return _compute(key, compute, timeout, grace, store)
+    if not acquire(key):
+        entry = _wait_for(key)
+        if entry is not None:
+            return entry[0]
+        value = compute()
+        if store(value):
+            _store(key, value, timeout, grace)
+        return value
+    return _compute(key, compute, timeout, grace, store)
@@ -0,0 +1,62 @@
+from django import template
+
+from core import generations
+from core.singleflight import get_or_compute
+
+
+register = template.Library()
+
+
+class GenerationCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, scopes, vary_on):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.scopes = scopes
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            timeout = int(self.timeout.resolve(context))
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'"gencache" tag got a non-integer timeout value: '
+                f'{self.timeout.var!r}'
+            )
+        scopes = self.scopes.resolve(context) or ()
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = generations.make_key(self.fragment_name, scopes, vary_on)
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context), timeout
+        )
+
+
+@register.tag('gencache')
+def do_gencache(parser, token):
+    """Cache a fragment until any of its scopes changes.
+
+    Usage::
+
+        {% gencache [timeout] [fragment_name] [scopes] [var1] ... %}
+          .. some expensive processing ..
+        {% endgencache %}
+
+    ``scopes`` is a list of scope names from the context; bumping the
+    generation of any of them (core.generations.bump) drops the fragment.
+    After ``timeout`` one request re-renders the fragment while the others
+    keep getting the stale copy for a short grace period.
+    """
+    nodelist = parser.parse(('endgencache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 4:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 3 arguments."
+        )
+    return GenerationCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        parser.compile_filter(tokens[3]),
+        [parser.compile_filter(bit) for bit in tokens[4:]],
+    )
@@ -0,0 +1,77 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+class QueryBudgetMixin:
+    """TestCase mixin checking views against their declared query budget.
+
+    The budget comes from core.decorators.query_budget on the view.
+    """
+
+    def count_queries(self, url, client=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def assertQueryBudget(self, url, grow, client=None):
+        """Check ``url`` before and after ``grow()`` adds more data.
+
+        Both requests must fit the view's budget and run the same number
+        of queries, so the page does not get slower as the data grows.
+        """
+        budget = resolve(url.split('?')[0]).func.query_budget
+        before = self.count_queries(url, client)
+        grow()
+        after = self.count_queries(url, client)
+        self.assertLessEqual(before, budget, url)
+        self.assertEqual(before, after, url)
+
+
+class QueryPlanMixin:
+    """TestCase mixin checking that a page's queries are served by indexes.
+
+    Every SELECT the page runs is passed through SQLite's ``EXPLAIN QUERY
+    PLAN``; full table scans and temporary B-trees for sorting or grouping
+    fail the test; scans of bounded subqueries are fine. ``allowed_scans``
+    lists tables that may be scanned, such as tiny lookup tables.
+    """
+    allowed_scans = ()
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def plan_problems(self, plan):
+        tables = set(connection.introspection.table_names())
+        tables.difference_update(self.allowed_scans)
+        problems = []
+        for step in plan:
+            if 'TEMP B-TREE' in step:
+                problems.append(step)
+                continue
+            # SQLite before 3.36 writes "SCAN TABLE name".
+            scan = re.match(r'SCAN (?:TABLE )?(\w+)', step)
+            if scan and 'INDEX' not in step and scan.group(1) in tables:
+                problems.append(step)
+        return problems
+
+    def assertIndexedQueries(self, url, client=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.client).get(url)
+        self.assertEqual(response.status_code, 200, url)
+        for query in queries:
+            sql = query['sql']
+            if not sql.startswith('SELECT'):
+                continue
+            plan = self.query_plan(sql)
+            with self.subTest(url=url, sql=sql):
+                self.assertEqual(self.plan_problems(plan), [],
+                                 '\n'.join(plan))
@@ -0,0 +1,95 @@
+import multiprocessing
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from ..cache_backends import SQLiteCache
+
+
+def _incr_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('hits')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_get_set_many(self):
+        """Значения любых типов переживают set_many/get_many."""
+        data = {'int': 1, 'text': 'строка', 'list': [1, {'a': None}]}
+        self.cache.set_many(data)
+        self.assertEqual(self.cache.get_many(['int', 'text', 'list', 'x']),
+                         data)
+        self.assertEqual(self.cache.get('x', 'default'), 'default')
+
+    def test_add_and_delete(self):
+        """add не перезаписывает живой ключ, delete его удаляет."""
+        self.assertTrue(self.cache.add('key', 'first'))
+        self.assertFalse(self.cache.add('key', 'second'))
+        self.assertEqual(self.cache.get('key'), 'first')
+        self.cache.delete('key')
+        self.assertFalse(self.cache.has_key('key'))
+
+    def test_expiry(self):
+        """Просроченный ключ не виден и может быть добавлен снова."""
+        self.cache.set('key', 'value', 0.05)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+
+    def test_incr(self):
+        """incr работает только с существующими целыми."""
+        self.cache.set('number', 1)
+        self.assertEqual(self.cache.incr('number', 5), 6)
+        self.assertEqual(self.cache.decr('number'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('text', 'a')
+        with self.assertRaises(ValueError):
+            self.cache.incr('text')
+
+    def test_shared_between_instances(self):
+        """Другой экземпляр с тем же файлом видит те же данные."""
+        self.cache.set('key', 'value')
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('key'), 'value')
+        other.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr_is_atomic_across_processes(self):
+        """Параллельные процессы не теряют инкременты."""
+        self.cache.set('hits', 0)
+        workers = [
+            multiprocessing.Process(target=_incr_many,
+                                    args=(self.location, 50))
+            for _ in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('hits'), 200)
+
+    def test_cull_evicts_least_recently_used(self):
+        """При переполнении вытесняются давно не читанные ключи."""
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2},
+        })
+        cache.set_many({f'key{number}': number for number in range(6)})
+        cache._connection().execute(
+            "UPDATE cache_entry SET accessed = 0 "
+            "WHERE key IN (':1:key0', ':1:key1', ':1:key2')"
+        )
+        cache.cull()
+        self.assertEqual(sorted(cache.get_many(
+            [f'key{number}' for number in range(6)]
+        )), ['key3', 'key4', 'key5'])
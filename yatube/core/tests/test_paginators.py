@@ -0,0 +1,50 @@
+from django.contrib.auth import get_user_model
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase
+
+from ..paginators import KeysetPaginator
+
+
+class ElidedPageRangeTests(SimpleTestCase):
+    def paginator(self, pages):
+        return KeysetPaginator(
+            get_user_model().objects.all(), 10, ordering=('pk',),
+            count=lambda: (pages * 10, False)
+        )
+
+    def test_window_around_current_page(self):
+        """Выводится окно вокруг текущей страницы и края."""
+        paginator = self.paginator(100_000)
+        ellipsis = paginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(5000)),
+            [1, 2, ellipsis, 4997, 4998, 4999, 5000, 5001, 5002, 5003,
+             ellipsis, 99_999, 100_000]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, 4, ellipsis, 99_999, 100_000]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(100_000)),
+            [1, 2, ellipsis, 99_997, 99_998, 99_999, 100_000]
+        )
+
+    def test_short_ranges_are_not_elided(self):
+        """Немногие страницы выводятся все."""
+        self.assertEqual(
+            list(self.paginator(8).get_elided_page_range(4)),
+            list(range(1, 9))
+        )
+
+    def test_navigation_size_does_not_grow(self):
+        """Размер навигации не зависит от числа страниц."""
+        items = []
+        for pages in (100, 100_000):
+            paginator = self.paginator(pages)
+            page = paginator._get_page([], 50, paginator)
+            html = render_to_string('posts/includes/paginator.html',
+                                    {'page_obj': page})
+            items.append(html.count('<li'))
+            self.assertLess(len(html), 4096)
+        self.assertEqual(items[0], items[1])
@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+from django.utils.http import http_date
+
+from .. import serving
+
+
+CONTENT = bytes(range(256)) * 4
+
+
+class ServeTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(cls.root, 'posts'))
+        with open(os.path.join(cls.root, 'posts', 'image.jpg'), 'wb') as f:
+            f.write(CONTENT)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(cls.root, ignore_errors=True)
+
+    def get(self, path='posts/image.jpg', **headers):
+        with override_settings(MEDIA_ROOT=self.root):
+            return self.client.get(f'/media/{path}', **headers)
+
+    def test_whole_file(self):
+        """Файл отдается целиком с валидаторами и долгим кешем."""
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(CONTENT)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertTrue(response['ETag'])
+
+    def test_conditional_requests(self):
+        """Неизмененный файл отвечает 304."""
+        response = self.get()
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        self.assertEqual(
+            self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        self.assertEqual(
+            self.get(HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304
+        )
+        self.assertEqual(
+            self.get(HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, 200
+        )
+
+    def test_byte_ranges(self):
+        """Отдается запрошенный диапазон байт."""
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content),
+                         CONTENT[10:20])
+        self.assertEqual(response['Content-Length'], '10')
+        self.assertEqual(response['Content-Range'],
+                         f'bytes 10-19/{len(CONTENT)}')
+        response = self.get(HTTP_RANGE='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content),
+                         CONTENT[-5:])
+        response = self.get(HTTP_RANGE=f'bytes={len(CONTENT)}-')
+        self.assertEqual(response.status_code, 416)
+
+    def test_stale_if_range_sends_whole_file(self):
+        """Диапазон к изменившемуся файлу заменяется полным ответом."""
+        response = self.get(HTTP_RANGE='bytes=10-19',
+                            HTTP_IF_RANGE='"outdated"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_and_outside_files(self):
+        """Отсутствующие файлы и выход за MEDIA_ROOT дают 404."""
+        self.assertEqual(self.get('posts/missing.jpg').status_code, 404)
+        self.assertEqual(self.get('posts').status_code, 404)
+        self.assertEqual(self.get('../etc/passwd').status_code, 404)
+
+    def test_sendfile_header(self):
+        """Передачу файла можно поручить веб-серверу."""
+        with mock.patch.object(serving, 'SENDFILE_HEADER',
+                               'X-Accel-Redirect'):
+            response = self.get()
+        self.assertEqual(
+            response['X-Accel-Redirect'],
+            '/protected' + os.path.join(self.root, 'posts', 'image.jpg')
+        )
+        self.assertEqual(response.content, b'')
@@ -0,0 +1,60 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from .. import singleflight
+from ..singleflight import get_or_compute
+
+
+class GetOrComputeTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'value {self.calls}'
+
+    def expire(self, key):
+        value, _ = cache.get(key)
+        cache.set(key, (value, 0), 60)
+
+    def test_fresh_value_is_reused(self):
+        """Свежее значение вычисляется один раз."""
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 1')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока другой запрос пересчитывает, отдается устаревшее значение."""
+        get_or_compute('key', self.compute, 60)
+        self.expire('key')
+        cache.add(singleflight._lock_key('key'), 1)
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 1')
+        self.assertEqual(self.calls, 1)
+
+    def test_stale_value_recomputed_by_lock_holder(self):
+        """Первый запрос после устаревания пересчитывает значение."""
+        get_or_compute('key', self.compute, 60)
+        self.expire('key')
+        self.assertEqual(get_or_compute('key', self.compute, 60), 'value 2')
+        self.assertFalse(cache.has_key(singleflight._lock_key('key')))
+
+    @mock.patch.object(singleflight, 'LOCK_WAIT', 0.2)
+    def test_miss_waits_for_lock_holder(self):
+        """При промахе запрос ждет, а не считает параллельно."""
+        cache.add(singleflight._lock_key('key'), 1)
+
+        def finish(seconds):
+            singleflight._store('key', 'computed elsewhere', 60, 60)
+
+        with mock.patch.object(singleflight.time, 'sleep', finish):
+            value = get_or_compute('key', self.compute, 60)
+        self.assertEqual(value, 'computed elsewhere')
+        self.assertEqual(self.calls, 0)
+
+    def test_store_predicate(self):
+        """Значение, отвергнутое store, не попадает в кеш."""
+        get_or_compute('key', self.compute, 60, store=lambda value: False)
+        self.assertIsNone(cache.get('key'))
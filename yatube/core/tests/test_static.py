@@ -0,0 +1,67 @@
+import gzip
+import os
+import shutil
+import tempfile
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.templatetags.static import static
+from django.test import SimpleTestCase, override_settings
+
+
+CSS = b'body { color: #212529; }\n' * 100
+
+
+class CompressedManifestTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        source = os.path.join(cls.directory, 'source')
+        os.makedirs(os.path.join(source, 'css'))
+        with open(os.path.join(source, 'css', 'site.css'), 'wb') as file:
+            file.write(CSS)
+        cls.settings = override_settings(
+            STATICFILES_DIRS=[source],
+            STATIC_ROOT=os.path.join(cls.directory, 'collected'),
+        )
+        cls.settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_collectstatic_writes_hashed_and_gzipped_files(self):
+        """collectstatic пишет файлы с хешем и сжатые копии."""
+        url = static('css/site.css')
+        self.assertRegex(url, r'^/static/css/site\.[0-9a-f]{12}\.css$')
+        name = url[len('/static/'):]
+        with staticfiles_storage.open(f'{name}.gz') as file:
+            self.assertEqual(gzip.decompress(file.read()), CSS)
+
+    def test_gzip_is_served_when_accepted(self):
+        """Сжатая копия отдается, если клиент принимает gzip."""
+        url = static('css/site.css')
+        response = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), CSS
+        )
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertEqual(b''.join(response.streaming_content), CSS)
+
+    def test_plain_names_are_revalidated(self):
+        """Файлы без хеша в имени не кешируются надолго."""
+        response = self.client.get('/static/css/site.css')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+
+    def test_uncollected_files_keep_their_names(self):
+        """Без манифеста шаблоны получают исходные имена."""
+        self.assertEqual(static('css/missing.css'), '/static/css/missing.css')
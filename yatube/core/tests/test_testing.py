@@ -0,0 +1,29 @@
+from django.test import TestCase
+
+from ..testing import QueryPlanMixin
+
+
+class QueryPlanTests(QueryPlanMixin, TestCase):
+    allowed_scans = ('posts_group',)
+
+    def test_full_scans_in_both_sqlite_formats(self):
+        """Полный просмотр таблицы ловится в обоих форматах SQLite."""
+        for step in ('SCAN posts_post', 'SCAN TABLE posts_post'):
+            with self.subTest(step=step):
+                self.assertEqual(self.plan_problems([step]), [step])
+
+    def test_indexed_and_allowed_scans_pass(self):
+        """Просмотр по индексу и разрешенные таблицы не считаются ошибкой."""
+        plan = [
+            'SCAN posts_post USING INDEX post_pub_date_idx',
+            'SCAN TABLE posts_post USING COVERING INDEX post_pub_date_idx',
+            'SEARCH TABLE posts_group USING INTEGER PRIMARY KEY (rowid=?)',
+            'SCAN TABLE posts_group',
+            'SCAN SUBQUERY 1',
+        ]
+        self.assertEqual(self.plan_problems(plan), [])
+
+    def test_temporary_sorts_are_problems(self):
+        """Временное B-дерево для сортировки считается ошибкой."""
+        step = 'USE TEMP B-TREE FOR ORDER BY'
+        self.assertEqual(self.plan_problems([step]), [step])
@@ -0,0 +1,76 @@
+from django.core.exceptions import ValidationError
+from django.core.files.uploadhandler import FileUploadHandler, SkipFile
+from django.template.defaultfilters import filesizeformat
+
+from core import images
+
+
+class ImageUploadHandler(FileUploadHandler):
+    """Refuse bad image uploads while they stream in.
+
+    The handler runs before Django's memory and temporary-file handlers.
+    It reads the image header out of the first chunks and checks format,
+    dimensions and pixel count (see core.images) before the rest of the
+    file is buffered, and it stops any file at ``IMAGE_UPLOAD_MAX_SIZE``.
+    A refused file is dropped from ``request.FILES`` and its error kept
+    in ``request.upload_errors`` for ``add_upload_errors``.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        self.request.upload_errors = {}
+
+    def new_file(self, field_name, file_name, content_type, content_length,
+                 charset=None, content_type_extra=None):
+        super().new_file(field_name, file_name, content_type, content_length,
+                         charset, content_type_extra)
+        self.received = 0
+        self.head = b''
+        self.inspected = False
+        if content_length and content_length > images.MAX_SIZE:
+            self.refuse(self.too_big())
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > images.MAX_SIZE:
+            self.refuse(self.too_big())
+        if not self.inspected:
+            self.head += raw_data
+            self.inspect()
+        return raw_data
+
+    def file_complete(self, file_size):
+        if not self.inspected:
+            # Too late to skip the file; the recorded error fails the form.
+            try:
+                images.inspect(self.head, complete=True)
+            except ValidationError as error:
+                self.request.upload_errors[self.field_name] = error
+        return None
+
+    def inspect(self):
+        try:
+            images.inspect(self.head)
+        except images.IncompleteHeader:
+            return
+        except ValidationError as error:
+            self.refuse(error)
+        self.inspected = True
+        self.head = b''
+
+    def too_big(self):
+        return ValidationError(
+            f'The file is larger than {filesizeformat(images.MAX_SIZE)}.',
+            code='file_size'
+        )
+
+    def refuse(self, error):
+        self.request.upload_errors[self.field_name] = error
+        raise SkipFile
+
+
+def add_upload_errors(request, form):
+    """Report files refused by ImageUploadHandler as errors of ``form``."""
+    for field_name, error in getattr(request, 'upload_errors', {}).items():
+        if field_name not in form.errors:
+            form.add_error(field_name, error)
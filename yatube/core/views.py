@@ -1,4 +1,19 @@
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import Http404
 from django.shortcuts import render
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.http import require_safe
+
+from core import serving
+
+
+# Media names never change their content: images are named by their hash
+# (core.storage) and sorl names thumbnails by source and options.
+MEDIA_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# Hashed static names are as stable; plain ones are revalidated.
+STATIC_CACHE_CONTROL = MEDIA_CACHE_CONTROL
+STATIC_PLAIN_CACHE_CONTROL = 'no-cache'
 
 
 def page_not_found(request, exception):
@@ -17,3 +32,30 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@require_safe
+def media(request, path):
+    return serving.serve(request, path, settings.MEDIA_ROOT,
+                         MEDIA_CACHE_CONTROL)
+
+
+@require_safe
+def static(request, path):
+    """Collected static files, the ``.gz`` variant where it is accepted."""
+    if staticfiles_storage.is_hashed(path):
+        cache_control = STATIC_CACHE_CONTROL
+    else:
+        cache_control = STATIC_PLAIN_CACHE_CONTROL
+    response = None
+    if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        try:
+            response = serving.serve(request, f'{path}.gz',
+                                     settings.STATIC_ROOT, cache_control)
+        except Http404:
+            pass
+    if response is None:
+        response = serving.serve(request, path, settings.STATIC_ROOT,
+                                 cache_control)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -1,4 +1,4 @@
-tfrom django.contrib import admin
+from django.contrib import admin
 
 from .models import Group, Post, Comment, Follow
 
@@ -0,0 +1,267 @@
+"""Read-only JSON API of the post feeds.
+
+Rows are read with ``.values()`` and serialized as they come, without
+model instances. Listings page by keyset cursors (see core.paginators)
+and never count rows; ``?fields=`` names the fields to read and
+``?limit=`` the page size. Pages larger than ``STREAM_THRESHOLD`` rows
+are streamed from a database iterator instead of being built in memory.
+"""
+import json
+from functools import wraps
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, StreamingHttpResponse
+from django.views.decorators.http import require_safe
+
+from core.decorators import generation_etag, query_budget
+from core.paginators import BACKWARD, InvalidCursor, KeysetPaginator
+from . import invalidation, timeline
+from .models import Comment, Group, Post, User
+
+
+CONTENT_TYPE = 'application/json'
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+STREAM_THRESHOLD = 100
+# Rows fetched from the database and written to the client at a time.
+STREAM_CHUNK = 100
+# Query parameters that change a response, see generation_etag.
+LISTING_PARAMS = ('cursor', 'limit', 'fields')
+# API field -> the lookup it is read from.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'image_width': 'image_width',
+    'image_height': 'image_height',
+    'comments_count': 'comments_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'post': 'post_id',
+    'author': 'author__username',
+    'text': 'text',
+    'pub_date': 'pub_date',
+}
+COMMENT_ORDERING = ('pub_date', 'id')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _error(message, status):
+    return HttpResponse(json.dumps({'error': message}),
+                        content_type=CONTENT_TYPE, status=status)
+
+
+def api_view(view):
+    """Serve only safe methods and answer ``ApiError`` with JSON."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return _error(str(error), error.status)
+    return require_safe(wrapper)
+
+
+def authenticated(view):
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return _error('Authentication required.', 401)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _image_url(name):
+    return Post.image.field.storage.url(name) if name else None
+
+
+CONVERTERS = {'image': _image_url}
+
+
+def _fields(request, fields):
+    value = request.GET.get('fields')
+    if not value:
+        return list(fields)
+    names = list(dict.fromkeys(value.split(',')))
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(f'Unknown fields: {", ".join(unknown)}.')
+    return names
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise ApiError('The limit is not an integer.')
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ApiError(f'The limit must be between 1 and {MAX_LIMIT}.')
+    return limit
+
+
+def _renderer(fields, names):
+    """Function turning a ``.values()`` row into its JSON object."""
+    columns = [(name, fields[name], CONVERTERS.get(name)) for name in names]
+
+    def render(row):
+        data = {}
+        for name, lookup, convert in columns:
+            value = row[lookup]
+            data[name] = convert(value) if convert else value
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return render
+
+
+def _values(queryset, fields, names, extra=()):
+    lookups = [fields[name] for name in names]
+    return queryset.values(*dict.fromkeys([*lookups, *extra]))
+
+
+def _pk(queryset):
+    pks = list(queryset.values_list('pk', flat=True)[:1])
+    if not pks:
+        raise ApiError('Not found.', 404)
+    return pks[0]
+
+
+class _Window:
+    """The first ``limit`` rows, noting whether there were more."""
+
+    def __init__(self, rows, limit):
+        self.rows = rows
+        self.limit = limit
+        self.more = False
+
+    def __iter__(self):
+        for count, row in enumerate(self.rows):
+            if count == self.limit:
+                self.more = True
+                return
+            yield row
+
+
+def _chunks(rows, render, links):
+    """``{"results": [...], "next": ..., "previous": ...}`` in chunks.
+
+    ``links(first, last)`` returns the cursors once all rows are read.
+    """
+    chunk = ['{"results":[']
+    first = last = None
+    for row in rows:
+        if first is None:
+            first = row
+        else:
+            chunk.append(',')
+        chunk.append(render(row))
+        last = row
+        if len(chunk) >= STREAM_CHUNK:
+            yield ''.join(chunk)
+            chunk = []
+    next_cursor, previous_cursor = links(first, last)
+    chunk.append(f'],"next":{json.dumps(next_cursor)},'
+                 f'"previous":{json.dumps(previous_cursor)}}}')
+    yield ''.join(chunk)
+
+
+def listing(request, queryset, fields, ordering=None):
+    """Response with the page of ``queryset`` the request's cursor opens."""
+    names = _fields(request, fields)
+    limit = _limit(request)
+    paginator = KeysetPaginator(queryset, limit, ordering=ordering)
+    cursor = request.GET.get('cursor')
+    try:
+        rows, number, direction = paginator.seek(cursor)
+    except InvalidCursor:
+        raise ApiError('The cursor is not valid.')
+    keys = [name for name, _ in paginator.key_fields]
+    rows = _values(rows, fields, names, keys)[:limit + 1]
+    backward = direction == BACKWARD
+    stream = limit > STREAM_THRESHOLD and not backward
+    window = _Window(rows.iterator(STREAM_CHUNK) if stream else rows, limit)
+    # Backward rows are read nearest first: a bounded list is reversed.
+    page = list(window)[::-1] if backward else window
+
+    def links(first, last):
+        if last is None:
+            return None, None
+        after = True if backward else window.more
+        before = window.more if backward else bool(cursor)
+        return (paginator.cursor_after(number, last) if after else None,
+                paginator.cursor_before(number, first) if before else None)
+
+    chunks = _chunks(page, _renderer(fields, names), links)
+    if stream:
+        return StreamingHttpResponse(chunks, content_type=CONTENT_TYPE)
+    return HttpResponse(''.join(chunks), content_type=CONTENT_TYPE)
+
+
+@query_budget(1)
+@api_view
+@generation_etag(invalidation.with_comments(invalidation.index_scopes),
+                 params=LISTING_PARAMS)
+def index(request):
+    return listing(request, Post.objects.all(), POST_FIELDS)
+
+
+@query_budget(2)
+@api_view
+@generation_etag(invalidation.with_comments(invalidation.group_scopes),
+                 params=LISTING_PARAMS)
+def group_posts(request, slug):
+    group_id = _pk(Group.objects.filter(slug=slug))
+    return listing(request, Post.objects.filter(group_id=group_id),
+                   POST_FIELDS)
+
+
+@query_budget(2)
+@api_view
+@generation_etag(invalidation.with_comments(invalidation.profile_scopes),
+                 params=LISTING_PARAMS)
+def profile(request, username):
+    author_id = _pk(User.objects.filter(username=username))
+    return listing(request, Post.objects.filter(author_id=author_id),
+                   POST_FIELDS)
+
+
+# Covers timeline.pull copying new posts of fan-out-on-read authors,
+# as in posts.views.follow_index.
+@query_budget(7)
+@api_view
+@authenticated
+@generation_etag(
+    viewer_scopes=invalidation.with_comments(invalidation.follow_scopes),
+    params=LISTING_PARAMS,
+)
+def follow_index(request):
+    return listing(request, timeline.feed(request.user.pk), POST_FIELDS)
+
+
+@query_budget(1)
+@api_view
+@generation_etag(invalidation.post_detail_scopes, params=('fields',))
+def post_detail(request, post_id):
+    names = _fields(request, POST_FIELDS)
+    rows = _values(Post.objects.filter(pk=post_id), POST_FIELDS, names)
+    rows = list(rows[:1])
+    if not rows:
+        raise ApiError('Not found.', 404)
+    render = _renderer(POST_FIELDS, names)
+    return HttpResponse(render(rows[0]), content_type=CONTENT_TYPE)
+
+
+@query_budget(2)
+@api_view
+@generation_etag(invalidation.post_detail_scopes, params=LISTING_PARAMS)
+def post_comments(request, post_id):
+    post_id = _pk(Post.objects.filter(pk=post_id))
+    return listing(request, Comment.objects.filter(post_id=post_id),
+                   COMMENT_FIELDS, ordering=COMMENT_ORDERING)
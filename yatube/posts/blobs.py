@@ -0,0 +1,60 @@
+"""Reference counting of post images in content-addressed storage.
+
+Posts with identical images share one file (core.storage), so a file may
+only go once no post refers to it any more. The posts referring to a
+name are its reference count; it is checked after the transaction that
+dropped a reference commits.
+
+A post saved with the same content in a transaction that has not
+committed yet is not counted, so files changed within ``MIN_AGE`` are
+kept: the storage touches a file whenever it hands it out again. Those
+are left to the collect_media_garbage command.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.db import transaction
+from django.utils import timezone
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from .models import Post
+
+
+MIN_AGE = getattr(settings, 'MEDIA_MIN_AGE', 60 * 60)
+
+
+def delete(name):
+    """Delete the image file ``name`` together with its thumbnails."""
+    image = ImageFile(name, Post._meta.get_field('image').storage)
+    # Deletes the thumbnails with their key-value entries as well.
+    default.kvstore.delete(image)
+    try:
+        image.delete()
+    except SuspiciousFileOperation:
+        # A name pointing outside MEDIA_ROOT was never ours to delete.
+        pass
+
+
+def is_settled(storage, name, min_age):
+    """Whether the file ``name`` has not changed for ``min_age`` seconds."""
+    try:
+        modified = storage.get_modified_time(name)
+    except (FileNotFoundError, SuspiciousFileOperation):
+        return False
+    return modified < timezone.now() - timedelta(seconds=min_age)
+
+
+def _delete_if_unused(name):
+    # The age is checked last, so a reference gained meanwhile counts.
+    if (not Post.objects.filter(image=name).exists()
+            and is_settled(Post._meta.get_field('image').storage, name,
+                           MIN_AGE)):
+        delete(name)
+
+
+def release(name):
+    """Drop one reference to the image file ``name``."""
+    if name:
+        transaction.on_commit(lambda: _delete_if_unused(name))
@@ -0,0 +1,158 @@
+"""Post cards rendered once and shared by every feed.
+
+A card is the markup of one post in a listing. It depends only on the
+post, its author and its group, never on the viewer, so it is cached
+under the post's ``version`` together with the author and group fields
+it shows. A page of posts is then put together from one ``get_many``,
+and only the missing cards are rendered.
+
+Cards are rendered from ``PostCard`` records rather than from model
+instances: a record holds just what the card templates show, its image
+already resolved to ``<picture>`` sources, and is cached as a compact
+JSON array. The record of a post is shared by all listing variants, so
+a card missing in one variant is rendered without the ORM or sorl.
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from . import thumbnails
+
+
+CARD_TIMEOUT = getattr(settings, 'POST_CARD_TIMEOUT', 60 * 60 * 24)
+# Listing variant -> template of its cards.
+TEMPLATES = {
+    'feed': 'posts/includes/cards/feed.html',
+    'group': 'posts/includes/cards/group.html',
+    'profile': 'posts/includes/cards/profile.html',
+}
+
+
+class AuthorCard:
+    __slots__ = ('username', 'full_name')
+
+    def __init__(self, username, full_name):
+        self.username = username
+        self.full_name = full_name
+
+    def get_full_name(self):
+        return self.full_name
+
+
+class GroupCard:
+    __slots__ = ('slug', 'title')
+
+    def __init__(self, slug, title):
+        self.slug = slug
+        self.title = title
+
+    def __str__(self):
+        return self.title
+
+
+class PostCard:
+    """What the card templates read of a post, author and group included.
+
+    The attributes mirror those of ``Post`` the templates use, so a card
+    template reads the same whether it gets a record or a model.
+    """
+
+    __slots__ = ('id', 'text', 'pub_date', 'author', 'group', 'src',
+                 'width', 'height', 'placeholder', 'picture_sources')
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_post(cls, post):
+        picture = thumbnails.post_picture(post)
+        group = post.group
+        return cls(
+            post.pk, post.text, post.pub_date,
+            AuthorCard(post.author.username, post.author.get_full_name()),
+            GroupCard(group.slug, group.title) if group else None,
+            picture.get('src', ''), picture.get('width'),
+            picture.get('height'), picture.get('placeholder', ''),
+            [[source['type'], source['srcset']]
+             for source in picture.get('sources', ())],
+        )
+
+    @property
+    def sources(self):
+        return [{'type': mime_type, 'srcset': srcset}
+                for mime_type, srcset in self.picture_sources]
+
+    def encode(self):
+        """A flat JSON array; the date in microseconds since the epoch."""
+        group = self.group
+        return json.dumps([
+            self.id, self.text, round(self.pub_date.timestamp() * 1e6),
+            self.author.username, self.author.full_name,
+            group.slug if group else None, group.title if group else None,
+            self.src, self.width, self.height, self.placeholder,
+            self.picture_sources,
+        ], ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def decode(cls, data):
+        (pk, text, pub_date, username, full_name, slug, title,
+         *picture) = json.loads(data)
+        return cls(
+            pk, text, datetime.fromtimestamp(pub_date / 1e6, timezone.utc),
+            AuthorCard(username, full_name),
+            GroupCard(slug, title) if slug is not None else None,
+            *picture
+        )
+
+
+def _related_digest(post):
+    related = [post.author.get_full_name()]
+    if post.group_id:
+        related.extend((post.group.slug, post.group.title))
+    return hashlib.md5('\0'.join(related).encode()).hexdigest()
+
+
+def card_key(post, variant):
+    return (f'card:{variant}:{post.pk}:{post.version}:'
+            f'{_related_digest(post)}')
+
+
+def record_key(post):
+    return f'postcard:{post.pk}:{post.version}:{_related_digest(post)}'
+
+
+def get_records(posts):
+    """``PostCard`` records of ``posts``, built only for cache misses."""
+    keys = [record_key(post) for post in posts]
+    found = cache.get_many(keys)
+    missing = [(key, post) for key, post in zip(keys, posts)
+               if key not in found]
+    built = {}
+    if missing:
+        thumbnails.prefetch([post for _, post in missing])
+        built = {key: PostCard.from_post(post) for key, post in missing}
+        cache.set_many({key: record.encode()
+                        for key, record in built.items()}, CARD_TIMEOUT)
+    return [built[key] if key in built else PostCard.decode(found[key])
+            for key in keys]
+
+
+def render_cards(posts, variant):
+    """Markup of the cards of ``posts`` in the ``variant`` listing."""
+    template = TEMPLATES[variant]
+    keys = [card_key(post, variant) for post in posts]
+    cards = cache.get_many(keys)
+    missing = [(key, post) for key, post in zip(keys, posts)
+               if key not in cards]
+    if missing:
+        records = get_records([post for _, post in missing])
+        rendered = {key: render_to_string(template, {'post': record})
+                    for (key, _), record in zip(missing, records)}
+        cache.set_many(rendered, CARD_TIMEOUT)
+        cards.update(rendered)
+    return [cards[key] for key in keys]
@@ -0,0 +1,26 @@
+"""Cached count scopes of the post feeds.
+
+Group and author feeds are counted by the denormalized counters in
+posts.stats, so only the global and follow feeds need cached counts.
+"""
+from core.counters import adjust, forget
+
+
+def all_scope():
+    return 'posts'
+
+
+def feed_scope(user_id):
+    return f'posts:feed:{user_id}'
+
+
+def post_added():
+    adjust(all_scope(), 1)
+
+
+def post_removed():
+    adjust(all_scope(), -1)
+
+
+def feeds_changed(user_ids):
+    forget(*[feed_scope(user_id) for user_id in user_ids])
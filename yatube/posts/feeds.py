@@ -0,0 +1,134 @@
+"""RSS and Atom feeds of the latest posts, per group and per author.
+
+Feeds are polled by scrapers, so each is served like a public page: the
+whole response comes from the page cache (see core.decorators), and a
+client repeating the ETag of its last poll gets a 304 after one cache
+lookup of the scope generations. No ``Last-Modified`` is sent: edits
+and deletions change a feed without moving the date of its newest post.
+Feeds carry at most ``FEED_ITEMS`` posts.
+"""
+from django.conf import settings
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from core.decorators import cache_public_page, generation_etag, query_budget
+from . import invalidation
+from .models import Group, Post, User
+
+
+FEED_ITEMS = getattr(settings, 'FEED_ITEMS', 20)
+TITLE_LENGTH = 60
+
+
+class PostsFeed(Feed):
+    """The latest posts of the site; subclasses narrow them down."""
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def __call__(self, request, *args, **kwargs):
+        response = super().__call__(request, *args, **kwargs)
+        del response['Last-Modified']
+        return response
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj):
+        return self.posts(obj).select_related('author',
+                                              'group')[:FEED_ITEMS]
+
+    def item_title(self, post):
+        return Truncator(post.text).chars(TITLE_LENGTH)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=(post.pk,))
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_author_link(self, post):
+        return reverse('posts:profile', args=(post.author.username,))
+
+    def item_pubdate(self, post):
+        return post.pub_date
+
+    def item_categories(self, post):
+        return (post.group.title,) if post.group else ()
+
+
+class GroupPostsFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def description(self, group):
+        return group.description
+
+    def link(self, group):
+        return reverse('posts:group', args=(group.slug,))
+
+    def posts(self, group):
+        return group.posts.all()
+
+
+class AuthorPostsFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def description(self, author):
+        return f'Записи пользователя {author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def posts(self, author):
+        return author.posts.all()
+
+
+class AtomPostsFeed(PostsFeed):
+    feed_type = Atom1Feed
+    subtitle = PostsFeed.description
+
+
+class AtomGroupPostsFeed(GroupPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, group):
+        return self.description(group)
+
+
+class AtomAuthorPostsFeed(AuthorPostsFeed):
+    feed_type = Atom1Feed
+
+    def subtitle(self, author):
+        return self.description(author)
+
+
+def feed_view(feed, scopes, queries):
+    """Serve ``feed`` from the page cache and answer conditional GETs."""
+    view = cache_public_page(scopes)(feed)
+    view = generation_etag(scopes, params=())(view)
+    return query_budget(queries)(view)
+
+
+index_rss = feed_view(PostsFeed(), invalidation.index_scopes, 1)
+index_atom = feed_view(AtomPostsFeed(), invalidation.index_scopes, 1)
+group_rss = feed_view(GroupPostsFeed(), invalidation.group_scopes, 2)
+group_atom = feed_view(AtomGroupPostsFeed(), invalidation.group_scopes, 2)
+profile_rss = feed_view(AuthorPostsFeed(), invalidation.profile_scopes, 2)
+profile_atom = feed_view(AtomAuthorPostsFeed(),
+                         invalidation.profile_scopes, 2)
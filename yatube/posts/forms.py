@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from core.images import strip_metadata
 from .models import Comment, Post
 
 
@@ -14,6 +16,20 @@ class PostForm(forms.ModelForm):
                       'group': 'Choose a group. Optional',
                       'image': 'Add an image'}
 
+    def clean_image(self):
+        image = self.cleaned_data['image']
+        if isinstance(image, UploadedFile):
+            return strip_metadata(image)
+        return image
+
+    def save(self, commit=True):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            self.instance.set_image_info(image.image_info)
+        elif not image:
+            self.instance.set_image_info(None)
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,93 @@
+"""Cache scopes of the posts pages and the changes that invalidate them.
+
+Scopes are named after what the URLs carry (group slug, username, post
+id), so a page can find its cache key without touching the database.
+"""
+from core.generations import bump
+
+
+def feed_scope():
+    return 'feed'
+
+
+def group_scope(slug):
+    return f'group:{slug}'
+
+
+def author_scope(username):
+    return f'author:{username}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def comments_scope():
+    return 'comments'
+
+
+def index_scopes():
+    return [feed_scope()]
+
+
+def group_scopes(slug):
+    return [group_scope(slug)]
+
+
+def profile_scopes(username):
+    return [author_scope(username)]
+
+
+def profile_viewer_scopes(user_id):
+    # The follow button depends on the viewer's subscriptions.
+    return [follow_scope(user_id)]
+
+
+def post_detail_scopes(post_id):
+    # The aside shows the author's post count, which any new post moves.
+    return [post_scope(post_id), feed_scope()]
+
+
+def follow_scopes(user_id):
+    # A new post by a followed author bumps the global feed as well.
+    return [follow_scope(user_id), feed_scope()]
+
+
+def with_comments(scopes):
+    """``scopes`` plus the scope of the comment counts listings carry.
+
+    Only the API listings show comment counts, so the HTML pages keep
+    their caches when a comment is written.
+    """
+    def listing_scopes(*args, **kwargs):
+        return [*scopes(*args, **kwargs), comments_scope()]
+    return listing_scopes
+
+
+def post_changed(post, old_group=None):
+    scopes = [feed_scope(), author_scope(post.author.username),
+              post_scope(post.pk)]
+    for group in (post.group, old_group):
+        if group is not None:
+            scopes.append(group_scope(group.slug))
+    bump(*scopes)
+
+
+def comment_changed(comment):
+    bump(post_scope(comment.post_id), comments_scope())
+
+
+def group_changed(group):
+    bump(feed_scope(), group_scope(group.slug))
+
+
+def author_changed(user):
+    bump(feed_scope(), author_scope(user.username))
+
+
+def follow_changed(follow):
+    bump(follow_scope(follow.user_id))
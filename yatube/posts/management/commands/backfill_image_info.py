@@ -0,0 +1,49 @@
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from core import images
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Record dimensions, format and placeholder of post images '
+            'uploaded before they were measured on upload.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Posts measured per UPDATE statement.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        pending = Post.objects.filter(image_width__isnull=True).exclude(
+            image=''
+        ).only('image').order_by('pk')
+        done = failed = 0
+        last_pk = 0
+        while True:
+            # Keyset batches: rows updated by one batch leave the filter,
+            # so nothing is read twice however long the run takes.
+            batch = list(pending.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            measured = []
+            for post in batch:
+                try:
+                    with post.image.open('rb') as file:
+                        post.set_image_info(images.describe(file))
+                except (OSError, SuspiciousFileOperation) as error:
+                    failed += 1
+                    self.stderr.write(f'Post {post.pk}: {error}')
+                    continue
+                # Cached cards (posts.cards) show the dimensions.
+                post.version = F('version') + 1
+                measured.append(post)
+            Post.objects.bulk_update(measured, (
+                'image_width', 'image_height', 'image_format',
+                'image_placeholder', 'version',
+            ))
+            done += len(measured)
+        self.stdout.write(f'Measured {done} images, {failed} failed.')
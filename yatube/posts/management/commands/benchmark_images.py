@@ -0,0 +1,64 @@
+import io
+
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts import thumbnails
+from posts.models import Post
+from posts.views import POST_NUMBER
+
+
+class Command(BaseCommand):
+    help = ('Compare bytes of one feed page of images: the single 900x400 '
+            'JPEG against the responsive variants a client would pick.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--synthetic', action='store_true',
+            help='Use generated photos instead of the newest post images.'
+        )
+
+    def handle(self, *args, synthetic, **options):
+        images = self.synthetic() if synthetic else self.newest()
+        if not images:
+            self.stdout.write('No post images; try --synthetic.')
+            return
+        before = sum(self.encode(image, 900, 'JPEG') for image in images)
+        self.stdout.write(f'{len(images)} images, 900x400 JPEG for every '
+                          f'client: {before} bytes')
+        for width in thumbnails.WIDTHS:
+            for image_format, _ in thumbnails.FORMATS:
+                after = sum(self.encode(image, width, image_format)
+                            for image in images)
+                self.stdout.write(
+                    f'{width}px client, {image_format:<4}: {after:>9} bytes '
+                    f'({after / before - 1:+.0%})'
+                )
+
+    def newest(self):
+        images = []
+        for post in Post.objects.exclude(image='')[:POST_NUMBER]:
+            with post.image.open('rb') as file:
+                images.append(Image.open(file).convert('RGB'))
+        return images
+
+    def synthetic(self):
+        images = []
+        for number in range(POST_NUMBER):
+            image = Image.effect_mandelbrot(
+                (1600, 1200), (-2 + number / 10, -1.2, 1, 1.2), 100
+            )
+            images.append(Image.merge('RGB', (
+                image, image.rotate(90), ImageOps.invert(image)
+            )))
+        return images
+
+    def encode(self, image, width, image_format):
+        # The same crop as the thumbnails: 9:4, anchored to the left.
+        variant = ImageOps.fit(image, (width, width * 4 // 9),
+                               centering=(0, 0.5))
+        buffer = io.BytesIO()
+        variant.save(buffer, image_format,
+                     quality=sorl_settings.THUMBNAIL_QUALITY)
+        return buffer.tell()
@@ -0,0 +1,69 @@
+import pickle
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posts.cards import AuthorCard, GroupCard, PostCard
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = ('Compare PostCard records with pickled Post instances: bytes '
+            'per cache entry and decode time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--entries', type=int, default=10000,
+            help='Number of posts encoded and decoded.'
+        )
+
+    def handle(self, *args, entries, **options):
+        author = User(pk=1, username='leo', first_name='Лев',
+                      last_name='Толстой')
+        group = Group(pk=1, title='Классика', slug='classics',
+                      description='Русская классика')
+        posts = [self.post(number, author, group)
+                 for number in range(entries)]
+        records = [
+            PostCard(post.pk, post.text, post.pub_date,
+                     AuthorCard(author.username, author.get_full_name()),
+                     GroupCard(group.slug, group.title),
+                     f'/media/cache/aa/bb/{number:032x}.jpg', 900, 400,
+                     'data:image/jpeg;base64,' + 'A' * 400,
+                     [['image/webp', '/media/a.webp 360w, /media/b.webp '
+                       '640w, /media/c.webp 900w']])
+            for number, post in enumerate(posts)
+        ]
+        variants = (
+            ('pickled Post', posts, pickle.dumps, pickle.loads),
+            ('PostCard JSON', records, PostCard.encode, PostCard.decode),
+        )
+        self.stdout.write(f'{"format":<14} {"bytes":>8} {"encode µs":>10} '
+                          f'{"decode µs":>10}')
+        for label, objects, encode, decode in variants:
+            start = time.perf_counter()
+            payloads = [encode(obj) for obj in objects]
+            encoded = time.perf_counter() - start
+            start = time.perf_counter()
+            for payload in payloads:
+                decode(payload)
+            decoded = time.perf_counter() - start
+            size = sum(
+                len(payload.encode() if isinstance(payload, str) else payload)
+                for payload in payloads
+            ) / entries
+            self.stdout.write(
+                f'{label:<14} {size:>8.0f} {encoded / entries * 1e6:>10.1f} '
+                f'{decoded / entries * 1e6:>10.1f}'
+            )
+
+    def post(self, number, author, group):
+        post = Post(pk=number, text='Все счастливые семьи похожи друг на '
+                    'друга. ' * 4, author=author, group=group,
+                    image=f'posts/aa/bb/{number:064x}.jpg',
+                    image_width=1200, image_height=800,
+                    image_format='JPEG',
+                    image_placeholder='data:image/jpeg;base64,' + 'A' * 400)
+        post.pub_date = timezone.now()
+        return post
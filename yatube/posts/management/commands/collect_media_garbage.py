@@ -0,0 +1,103 @@
+import posixpath
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from posts import blobs
+from posts.models import Post
+
+
+def walk(storage, path):
+    """Names of the files below ``path``, one directory listed at a time."""
+    try:
+        directories, files = storage.listdir(path)
+    except FileNotFoundError:
+        return
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from walk(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = ('Delete post images no post refers to and thumbnails sorl '
+            'no longer knows about.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Files checked against the database per query.'
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=blobs.MIN_AGE,
+            help=('Seconds since its last change before a file may go; '
+                  'protects uploads whose post is not committed yet.')
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be deleted.'
+        )
+
+    def handle(self, *args, batch_size, min_age, dry_run, **options):
+        self.dry_run = dry_run
+        self.min_age = min_age
+        field = Post._meta.get_field('image')
+        # Originals go first: deleting one deletes its thumbnails as well.
+        self.collect(
+            'images', field.storage, field.upload_to.rstrip('/'),
+            self.used_images, blobs.delete, batch_size
+        )
+        self.collect(
+            'thumbnails', default.storage,
+            sorl_settings.THUMBNAIL_PREFIX.rstrip('/'),
+            self.used_thumbnails, default.storage.delete, batch_size
+        )
+
+    def collect(self, label, storage, root, find_used, delete, batch_size):
+        started = time.monotonic()
+        scanned = deleted = freed = 0
+        names = walk(storage, root)
+        while True:
+            batch = list(islice(names, batch_size))
+            if not batch:
+                break
+            scanned += len(batch)
+            used = find_used(batch)
+            for name in batch:
+                # The age is checked last, right before deleting, so a
+                # file that gained a reference meanwhile is left alone.
+                if (name in used
+                        or not blobs.is_settled(storage, name, self.min_age)):
+                    continue
+                freed += storage.size(name)
+                deleted += 1
+                if not self.dry_run:
+                    delete(name)
+        elapsed = time.monotonic() - started
+        verb = 'Would delete' if self.dry_run else 'Deleted'
+        self.stdout.write(
+            f'{verb} {deleted} of {scanned} {label} '
+            f'({freed / 2 ** 20:.1f} MB) in {elapsed:.1f}s, '
+            f'{scanned / max(elapsed, 1e-3):.0f} files/s.'
+        )
+
+    def used_images(self, names):
+        return set(Post.objects.filter(image__in=names).values_list(
+            'image', flat=True
+        ))
+
+    def used_thumbnails(self, names):
+        # A thumbnail is in use while sorl's key-value store lists it.
+        keys = {
+            add_prefix(ImageFile(name, default.storage).key): name
+            for name in names
+        }
+        return {keys[key] for key in KVStore.objects.filter(
+            key__in=keys
+        ).values_list('key', flat=True)}
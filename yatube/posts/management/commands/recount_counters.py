@@ -0,0 +1,34 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts import stats
+from posts.models import Group, Post, User
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized post, comment and follower counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows recounted per UPDATE statement.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        targets = (
+            ('groups', Group, stats.recount_groups),
+            ('posts', Post, stats.recount_posts),
+            ('users', User, stats.recount_users),
+        )
+        for label, model, recount in targets:
+            ids = model.objects.order_by('pk').values_list(
+                'pk', flat=True
+            ).iterator(chunk_size=batch_size)
+            total = 0
+            while True:
+                batch = list(islice(ids, batch_size))
+                if not batch:
+                    break
+                total += recount(batch)
+            self.stdout.write(f'Recounted {total} {label}.')
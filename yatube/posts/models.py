@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.db import models
 
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 
 
 User = get_user_model()
@@ -18,6 +19,11 @@ class Group(models.Model):
         verbose_name='description',
         help_text='What is this group about'
     )
+    posts_count = models.PositiveIntegerField(
+        'Posts count',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
@@ -46,17 +52,71 @@ class Post(CreatedModel):
     image = models.ImageField(
         'Image',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    # Measured once on upload (core.images.ImageInfo), so pages can size
+    # the image and show its placeholder without opening the file.
+    image_width = models.PositiveIntegerField(
+        'Image width',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Image height',
+        blank=True,
+        null=True,
+        editable=False
+    )
+    image_format = models.CharField(
+        'Image format',
+        max_length=10,
+        blank=True,
+        editable=False
+    )
+    image_placeholder = models.TextField(
+        'Image placeholder',
+        blank=True,
+        editable=False
+    )
+    comments_count = models.PositiveIntegerField(
+        'Comments count',
+        default=0,
+        editable=False
+    )
+    # Bumped on every change to what the post's card shows (posts.cards).
+    version = models.PositiveIntegerField(
+        'Version',
+        default=1,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date', '-id')
+        # One index per listing: the feed, a group and an author, each
+        # matching the keyset order so pages are read without sorting.
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_feed_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_feed_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_feed_idx'),
+        )
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
 
     def __str__(self):
         return self.text[:15]
 
+    def set_image_info(self, info):
+        """Record the ``ImageInfo`` of the image; ``None`` forgets it."""
+        self.image_format = info.format if info else ''
+        self.image_width = info.width if info else None
+        self.image_height = info.height if info else None
+        self.image_placeholder = info.placeholder if info else ''
+
 
 class Comment(CreatedModel):
     post = models.ForeignKey(
@@ -76,6 +136,10 @@ class Comment(CreatedModel):
         help_text='Write your comment here'
     )
 
+    class Meta:
+        indexes = (models.Index(fields=('post', 'pub_date'),
+                                name='comment_post_idx'),)
+
     def __str__(self):
         return self.text[:15]
 
@@ -101,3 +165,54 @@ class Follow(models.Model):
 
     def __str__(self):
         return self.user
+
+
+class UserStats(models.Model):
+    """Denormalized per-user counters, kept current by posts.stats."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='User'
+    )
+    posts_count = models.PositiveIntegerField('Posts count', default=0)
+    followers_count = models.PositiveIntegerField('Followers count',
+                                                  default=0)
+    following_count = models.PositiveIntegerField('Following count',
+                                                  default=0)
+
+    class Meta:
+        verbose_name = 'User stats'
+        verbose_name_plural = 'User stats'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Materialized follow feed: one row per reader and post."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Reader'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Post'
+    )
+    # Copy of post.pub_date, so the feed is read from this table alone.
+    pub_date = models.DateTimeField('Publication date')
+
+    class Meta:
+        ordering = ('-pub_date', '-post')
+        constraints = (models.UniqueConstraint(fields=('user', 'post'),
+                                               name='unique_timeline_entry'),)
+        indexes = (models.Index(fields=('user', '-pub_date', '-post'),
+                                name='timeline_user_feed_idx'),)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.post_id}'
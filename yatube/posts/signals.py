@@ -0,0 +1,115 @@
+from django.db.models import DEFERRED, F
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import blobs, counts, invalidation, stats, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which no page shows.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidation.author_changed(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidation.author_changed(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    invalidation.group_changed(instance)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not loaded here, one
+    # query per post.
+    instance._initial_group_id = instance.__dict__.get('group_id', DEFERRED)
+    instance._initial_image = instance.__dict__.get('image')
+
+
+@receiver(pre_save, sender=Post)
+def bump_version(sender, instance, raw=False, **kwargs):
+    # Bumped in the UPDATE itself: a version the instance loaded earlier
+    # would undo bumps made since, e.g. by posts.thumbnails.
+    if not instance._state.adding and not raw:
+        instance.version = F('version') + 1
+
+
+@receiver(post_save, sender=Post)
+def reload_version(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        instance.refresh_from_db(fields=['version'])
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_group = None
+    if created:
+        stats.post_added(instance.author_id, instance.group_id)
+        counts.post_added()
+        timeline.fan_out(instance)
+    elif instance._initial_group_id not in (DEFERRED, instance.group_id):
+        stats.group_changed(instance._initial_group_id, instance.group_id)
+        old_group = Group.objects.filter(
+            pk=instance._initial_group_id
+        ).first()
+    if created or instance.image.name != instance._initial_image:
+        thumbnails.pregenerate(instance)
+        if not created:
+            blobs.release(instance._initial_image)
+    invalidation.post_changed(instance, old_group)
+    instance._initial_group_id = instance.group_id
+    instance._initial_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    stats.post_removed(instance.author_id, instance.group_id)
+    counts.post_removed()
+    counts.feeds_changed(Follow.objects.filter(
+        author_id=instance.author_id
+    ).values_list('user_id', flat=True))
+    invalidation.post_changed(instance)
+    blobs.release(instance.image.name)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.comment_added(instance.post_id)
+    invalidation.comment_changed(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.comment_removed(instance.post_id)
+    invalidation.comment_changed(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.follow_added(instance.user_id, instance.author_id)
+        if not timeline.is_pulled(instance.author_id):
+            timeline.backfill(instance.user_id, instance.author_id)
+        invalidation.follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.follow_removed(instance.user_id, instance.author_id)
+    timeline.prune(instance.user_id, instance.author_id)
+    invalidation.follow_changed(instance)
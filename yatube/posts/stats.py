@@ -0,0 +1,121 @@
+"""Denormalized counters on Group, Post and UserStats.
+
+The signal handlers shift them with F() expressions as rows are created
+and deleted. A shift that finds no row to update recounts that row
+instead, so a missing UserStats row or a drifted zero heals itself. The
+``recount_*`` functions also back the ``recount_counters`` command.
+"""
+from functools import partial
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+
+def _count_of(model, field):
+    rows = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), Value(0))
+
+
+def recount_groups(ids):
+    return Group.objects.filter(pk__in=ids).update(
+        posts_count=_count_of(Post, 'group')
+    )
+
+
+def recount_posts(ids):
+    return Post.objects.filter(pk__in=ids).update(
+        comments_count=_count_of(Comment, 'post')
+    )
+
+
+def recount_users(ids, create=True):
+    if create:
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=user_id) for user_id in ids],
+            ignore_conflicts=True
+        )
+    return UserStats.objects.filter(pk__in=ids).update(
+        posts_count=_count_of(Post, 'author'),
+        followers_count=_count_of(Follow, 'author'),
+        following_count=_count_of(Follow, 'user'),
+    )
+
+
+def of(user):
+    """The user's counters, created on the spot if the row is missing."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        recount_users([user.pk])
+        user.stats = UserStats.objects.get(pk=user.pk)
+        return user.stats
+
+
+def _shift(model, pk, field, delta, recount):
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    if not rows.update(**{field: F(field) + delta}):
+        recount([pk])
+
+
+def _shift_group(group_id, delta):
+    _shift(Group, group_id, 'posts_count', delta, recount_groups)
+
+
+def _shift_post(post_id, delta):
+    _shift(Post, post_id, 'comments_count', delta, recount_posts)
+
+
+def _shift_user(user_id, field, delta):
+    # Removals also run while a deleted user's posts and follows are
+    # cascaded, after the stats row is gone; they must not recreate it.
+    _shift(UserStats, user_id, field, delta,
+           partial(recount_users, create=delta > 0))
+
+
+@transaction.atomic
+def post_added(author_id, group_id):
+    _shift_user(author_id, 'posts_count', 1)
+    if group_id is not None:
+        _shift_group(group_id, 1)
+
+
+@transaction.atomic
+def post_removed(author_id, group_id):
+    _shift_user(author_id, 'posts_count', -1)
+    if group_id is not None:
+        _shift_group(group_id, -1)
+
+
+@transaction.atomic
+def group_changed(old_group_id, new_group_id):
+    if old_group_id is not None:
+        _shift_group(old_group_id, -1)
+    if new_group_id is not None:
+        _shift_group(new_group_id, 1)
+
+
+def comment_added(post_id):
+    _shift_post(post_id, 1)
+
+
+def comment_removed(post_id):
+    _shift_post(post_id, -1)
+
+
+@transaction.atomic
+def follow_added(user_id, author_id):
+    _shift_user(author_id, 'followers_count', 1)
+    _shift_user(user_id, 'following_count', 1)
+
+
+@transaction.atomic
+def follow_removed(user_id, author_id):
+    _shift_user(author_id, 'followers_count', -1)
+    _shift_user(user_id, 'following_count', -1)
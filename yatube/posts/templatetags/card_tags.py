@@ -0,0 +1,17 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import cards
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, variant):
+    """Markup of the cards of ``posts``, from the shared card cache.
+
+    Usage: ``{% post_cards page_obj 'feed' as cards %}``.
+    """
+    return [mark_safe(card)
+            for card in cards.render_cards(list(posts), variant)]
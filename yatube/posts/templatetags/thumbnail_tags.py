@@ -0,0 +1,12 @@
+from django import template
+
+from posts import thumbnails
+
+
+register = template.Library()
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(post):
+    """Responsive ``<picture>`` of the post image in WebP and JPEG."""
+    return thumbnails.post_picture(post)
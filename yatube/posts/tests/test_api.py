@@ -0,0 +1,204 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts import api
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        self.posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.user,
+                                group=self.group if number % 2 else None)
+            for number in range(25)
+        ]
+        self.reader = User.objects.create_user(username='reader')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def get(self, url, client=None, status=200, **params):
+        response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, status, url)
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return json.loads(response.content)
+
+    def walk(self, url, **params):
+        """Идентификаторы всех постов, пройденных по курсорам вперед."""
+        ids = []
+        page = self.get(url, **params)
+        while True:
+            ids.extend(post['id'] for post in page['results'])
+            if not page['next']:
+                return ids
+            page = self.get(url, cursor=page['next'], **params)
+
+    def test_cursor_pages(self):
+        """Курсоры проходят ленту вперед и назад без пропусков."""
+        url = reverse('api:index')
+        expected = [post.pk for post in reversed(self.posts)]
+        self.assertEqual(self.walk(url, limit=10), expected)
+        first = self.get(url, limit=10)
+        self.assertIsNone(first['previous'])
+        second = self.get(url, limit=10, cursor=first['next'])
+        back = self.get(url, limit=10, cursor=second['previous'])
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+        self.assertEqual(self.get(url, cursor='bad', status=400),
+                         {'error': 'The cursor is not valid.'})
+
+    def test_fields_selection(self):
+        """Параметр fields ограничивает выводимые поля."""
+        url = reverse('api:index')
+        page = self.get(url, fields='id,author,group', limit=2)
+        self.assertEqual(page['results'][0], {
+            'id': self.posts[-1].pk, 'author': 'auth', 'group': None,
+        })
+        self.assertEqual(page['results'][1]['group'], 'group')
+        self.get(url, fields='id,password', status=400)
+        self.get(url, limit=api.MAX_LIMIT + 1, status=400)
+
+    def test_rows_are_not_models(self):
+        """Ответы собираются из values() без экземпляров моделей."""
+        with mock.patch.object(Post, 'from_db') as from_db:
+            self.get(reverse('api:index'))
+            self.get(reverse('api:post_detail', args=(self.posts[0].pk,)))
+        from_db.assert_not_called()
+
+    def test_large_pages_are_streamed(self):
+        """Большие страницы отдаются потоком."""
+        url = reverse('api:index')
+        response = self.client.get(url, {'limit': api.STREAM_THRESHOLD + 1})
+        self.assertTrue(response.streaming)
+        self.assertEqual(self.walk(url, limit=api.STREAM_THRESHOLD + 1),
+                         [post.pk for post in reversed(self.posts)])
+        self.assertFalse(self.client.get(url).streaming)
+
+    def test_group_and_profile(self):
+        """Лента группы и автора; неизвестные адреса дают 404."""
+        group = self.walk(reverse('api:group', args=('group',)))
+        self.assertEqual(group, [post.pk for post in reversed(self.posts)
+                                 if post.group_id])
+        profile = self.walk(reverse('api:profile', args=('auth',)))
+        self.assertEqual(len(profile), 25)
+        self.get(reverse('api:group', args=('missing',)), status=404)
+        self.get(reverse('api:profile', args=('missing',)), status=404)
+
+    def test_follow_feed(self):
+        """Лента подписок доступна только авторизованному читателю."""
+        url = reverse('api:follow_index')
+        self.get(url, status=401)
+        self.assertEqual(self.get(url, self.reader_client)['results'], [])
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertEqual(len(self.walk_follow(url)), 25)
+
+    def walk_follow(self, url):
+        ids, cursor = [], ''
+        while True:
+            page = self.get(url, self.reader_client, cursor=cursor)
+            ids.extend(post['id'] for post in page['results'])
+            cursor = page['next']
+            if not cursor:
+                return ids
+
+    def test_post_and_comments(self):
+        """Пост и его комментарии в порядке публикации."""
+        post = self.posts[0]
+        for number in range(3):
+            Comment.objects.create(post=post, author=self.reader,
+                                   text=f'Комментарий {number}')
+        detail = self.get(reverse('api:post_detail', args=(post.pk,)))
+        self.assertEqual(detail['text'], 'Пост 0')
+        self.assertEqual(detail['comments_count'], 3)
+        self.assertIsNone(detail['image'])
+        comments = self.get(reverse('api:post_comments', args=(post.pk,)),
+                            limit=2)
+        self.assertEqual([comment['text'] for comment in comments['results']],
+                         ['Комментарий 0', 'Комментарий 1'])
+        self.assertEqual(comments['results'][0]['author'], 'reader')
+        self.get(reverse('api:post_detail', args=(0,)), status=404)
+
+    def test_unchanged_response_is_not_modified(self):
+        """Повторный запрос с ETag получает 304, пока лента не изменилась."""
+        url = reverse('api:index')
+        etag = self.client.get(url, {'fields': 'id'})['ETag']
+        response = self.client.get(url, {'fields': 'id'},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(url, {'fields': 'id'},
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_comments_change_listing_etags(self):
+        """Новый комментарий меняет ETag лент с числом комментариев."""
+        post = self.posts[-2]
+        urls = (reverse('api:index'), reverse('api:group', args=('group',)),
+                reverse('api:profile', args=('auth',)))
+        etags = [self.client.get(url)['ETag'] for url in urls]
+        Comment.objects.create(post=post, author=self.reader,
+                               text='Комментарий')
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                counts = {row['id']: row['comments_count'] for row
+                          in json.loads(response.content)['results']}
+                self.assertEqual(counts[post.pk], 1)
+
+    def test_comments_keep_html_caches(self):
+        """Комментарий не сбрасывает кэш HTML-лент и не грузит пост."""
+        post = self.posts[-2]
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(2):
+            Comment.objects.create(post_id=post.pk, author=self.reader,
+                                   text='Комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_query_budget(self):
+        """Число запросов API не растет вместе с данными."""
+        def grow():
+            for number in range(5):
+                post = Post.objects.create(text='Еще пост', author=self.user,
+                                           group=self.group)
+                Comment.objects.create(post=post, author=self.reader,
+                                       text='Комментарий')
+
+        urls = (
+            reverse('api:index'),
+            reverse('api:group', args=('group',)),
+            reverse('api:profile', args=('auth',)),
+            reverse('api:post_detail', args=(self.posts[-1].pk,)),
+            reverse('api:post_comments', args=(self.posts[-1].pk,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, grow)
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.assertQueryBudget(reverse('api:follow_index'), grow,
+                               self.reader_client)
+
+    def test_follow_budget_with_pulled_author(self):
+        """Лента подписок с популярным автором укладывается в бюджет."""
+        url = reverse('api:follow_index')
+        Follow.objects.create(user=self.reader, author=self.user)
+        queries = []
+        with mock.patch('posts.timeline.FANOUT_LIMIT', 0):
+            for _ in range(2):
+                Post.objects.create(text='Новый пост', author=self.user)
+                queries.append(self.count_queries(url, self.reader_client))
+        self.assertEqual(queries[0], queries[1])
+        self.assertLessEqual(queries[0], api.follow_index.query_budget)
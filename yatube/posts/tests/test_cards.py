@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import cards, thumbnails
+from posts.models import Group, Post, User
+
+
+class PostCardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        for number in range(3):
+            Post.objects.create(text=f'Пост {number}', author=self.user,
+                                group=self.group)
+
+    def render(self, variant='feed'):
+        posts = list(Post.objects.select_related('author', 'group'))
+        with mock.patch.object(cards, 'render_to_string',
+                               wraps=cards.render_to_string) as render:
+            markup = cards.render_cards(posts, variant)
+        return markup, render.call_count
+
+    def test_cards_are_rendered_once(self):
+        """Карточки рендерятся один раз и берутся из кеша одним запросом."""
+        markup, rendered = self.render()
+        self.assertEqual(rendered, 3)
+        self.assertIn('Пост 2', markup[0])
+        with mock.patch.object(cache, 'get_many',
+                               wraps=cache.get_many) as get_many:
+            self.assertEqual(self.render(), (markup, 0))
+        get_many.assert_called_once()
+        self.assertEqual(self.render('group')[1], 3)
+
+    def test_changes_rerender_only_their_cards(self):
+        """Правка поста или группы обновляет только затронутые карточки."""
+        self.render()
+        post = Post.objects.first()
+        post.text = 'Исправленный пост'
+        post.save()
+        markup, rendered = self.render()
+        self.assertEqual(rendered, 1)
+        self.assertIn('Исправленный пост', markup[0])
+        self.group.slug = 'renamed'
+        self.group.save()
+        self.assertEqual(self.render()[1], 3)
+
+    def test_record_round_trip(self):
+        """Запись карточки кодируется в компактный JSON без потерь."""
+        post = Post.objects.select_related('author', 'group').first()
+        record = cards.PostCard.from_post(post)
+        decoded = cards.PostCard.decode(record.encode())
+        for name in ('id', 'text', 'pub_date', 'src', 'picture_sources'):
+            self.assertEqual(getattr(decoded, name), getattr(record, name))
+        self.assertEqual(decoded.pub_date, post.pub_date)
+        self.assertEqual(decoded.author.username, 'auth')
+        self.assertEqual(str(decoded.group), 'Группа')
+        self.assertLess(len(record.encode()), 200)
+
+    def test_variants_share_records(self):
+        """Другой вариант карточки рендерится из готовой записи."""
+        self.render('feed')
+        with mock.patch.object(thumbnails, 'prefetch') as prefetch:
+            self.assertEqual(self.render('profile')[1], 3)
+        prefetch.assert_not_called()
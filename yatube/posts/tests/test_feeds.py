@@ -0,0 +1,102 @@
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.testing import QueryBudgetMixin
+from posts import feeds
+from posts.models import Group, Post, User
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+
+
+class FeedTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth',
+                                             first_name='Лев',
+                                             last_name='Толстой')
+        self.group = Group.objects.create(title='Группа', slug='group',
+                                          description='Описание')
+        for number in range(3):
+            Post.objects.create(text=f'Пост {number}', author=self.user,
+                                group=self.group if number else None)
+
+    def test_rss_and_atom(self):
+        """Ленты RSS и Atom содержат записи от новых к старым."""
+        rss = self.client.get(reverse('posts:index_rss'))
+        self.assertEqual(rss['Content-Type'],
+                         'application/rss+xml; charset=utf-8')
+        items = ElementTree.fromstring(rss.content).findall('channel/item')
+        self.assertEqual([item.findtext('title') for item in items],
+                         ['Пост 2', 'Пост 1', 'Пост 0'])
+        self.assertEqual(items[0].findtext('category'), 'Группа')
+        atom = self.client.get(reverse('posts:group_atom', args=('group',)))
+        entries = ElementTree.fromstring(atom.content).findall(
+            f'{ATOM}entry')
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[0].findtext(f'{ATOM}author/{ATOM}name'),
+                         'Лев Толстой')
+        atom = self.client.get(reverse('posts:profile_atom', args=('auth',)))
+        self.assertEqual(len(ElementTree.fromstring(atom.content).findall(
+            f'{ATOM}entry')), 3)
+        self.assertEqual(self.client.get(
+            reverse('posts:group_rss', args=('missing',))).status_code, 404)
+
+    def test_items_are_bounded(self):
+        """Лента содержит не больше FEED_ITEMS записей."""
+        Post.objects.bulk_create(
+            Post(text='Еще пост', author=self.user)
+            for _ in range(feeds.FEED_ITEMS)
+        )
+        response = self.client.get(reverse('posts:index_rss'))
+        items = ElementTree.fromstring(response.content).findall(
+            'channel/item')
+        self.assertEqual(len(items), feeds.FEED_ITEMS)
+
+    def test_conditional_get(self):
+        """Опрос без изменений получает 304 без запросов к базе."""
+        url = reverse('posts:profile_rss', args=('auth',))
+        response = self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(url)
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(not_modified.status_code, 304)
+        Post.objects.create(text='Новый пост', author=self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Новый пост', response.content.decode())
+
+    def test_edits_are_not_hidden_by_dates(self):
+        """Правка старого поста не прячется за датой последнего поста."""
+        url = reverse('posts:profile_rss', args=('auth',))
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        post = Post.objects.filter(author=self.user).last()
+        post.text = 'Исправленный пост'
+        post.save()
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Исправленный пост', response.content.decode())
+
+    def test_query_budget(self):
+        """Число запросов ленты не растет вместе с данными."""
+        def grow():
+            Post.objects.bulk_create(
+                Post(text='Еще пост', author=self.user, group=self.group)
+                for _ in range(5)
+            )
+
+        for name, args in (('posts:index_atom', ()),
+                           ('posts:group_rss', ('group',)),
+                           ('posts:profile_atom', ('auth',))):
+            with self.subTest(name=name):
+                self.assertQueryBudget(reverse(name, args=args), grow)
@@ -1,11 +1,25 @@
+import io
+import os
 import shutil
+import struct
 import tempfile
+import threading
+import tracemalloc
+import zlib
+from unittest import mock
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.core.management import call_command
+from django.template.defaultfilters import filesizeformat
+from django.test import (Client, RequestFactory, TestCase,
+                         TransactionTestCase, override_settings)
 from django.urls import reverse
+from PIL import Image
 
+from core import images
+from core.storage import ContentAddressedStorage
+from posts import blobs
 from posts.models import Group, Post, User
 
 
@@ -72,12 +86,13 @@ class TaskViewTests(TestCase):
         )
         self.assertEqual(Post.objects.get(id=2).group.id, 1)
         self.assertEqual(Post.objects.get(id=2).author.username, 'auth')
-        self.assertEqual(Post.objects.get(id=2).image, 'posts/small.gif')
+        self.assertRegex(Post.objects.get(id=2).image.name,
+                         r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.gif$')
         self.assertTrue(
             Post.objects.filter(
                 text='новый проверочный пост',
                 group=1,
-                image='posts/small.gif'
+                image__startswith='posts/'
             ).exists()
         )
 
@@ -100,3 +115,188 @@ class TaskViewTests(TestCase):
         )
         self.assertEqual(Post.objects.get(id=1).group.title, 'Тестовая группа')
         self.assertEqual(Post.objects.get(id=1).author.username, 'auth')
+
+
+def png_claiming(width, height):
+    """A tiny PNG whose header claims ``width`` x ``height`` pixels."""
+    buffer = io.BytesIO()
+    Image.new('L', (1, 1)).save(buffer, 'PNG')
+    data = bytearray(buffer.getvalue())
+    header = b'IHDR' + struct.pack('>II', width, height) + bytes(data[24:29])
+    data[12:29] = header
+    data[29:33] = struct.pack('>I', zlib.crc32(header))
+    return bytes(data)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='uploader')
+        self.client.force_login(self.user)
+
+    def post_image(self, content, name='image.png'):
+        return self.client.post(reverse('posts:post_create'), {
+            'text': 'пост с картинкой',
+            'image': SimpleUploadedFile(name, content),
+        })
+
+    def test_pixel_bomb_is_refused(self):
+        """Картинка со слишком большим разрешением отклоняется."""
+        response = self.post_image(png_claiming(6000, 5000))
+        self.assertFormError(response, 'form', 'image',
+                             'The image is too large: 6000x5000 pixels.')
+        self.assertFalse(Post.objects.exists())
+
+    def test_oversized_upload_is_refused(self):
+        """Слишком большой файл отклоняется."""
+        with mock.patch.object(images, 'MAX_SIZE', 1024):
+            response = self.post_image(png_claiming(10, 10) + b'0' * 4096)
+        self.assertFormError(
+            response, 'form', 'image',
+            f'The file is larger than {filesizeformat(1024)}.'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_timed_out_reencode_is_dropped(self):
+        """Перекодирование, не дождавшееся потока, снимается с очереди."""
+        release = threading.Event()
+        busy = [images._executor.submit(release.wait)
+                for _ in range(images.WORKERS)]
+        with mock.patch.object(images, 'REENCODE_TIMEOUT', 0.01), \
+                mock.patch.object(images, '_reencode') as reencode:
+            response = self.post_image(png_claiming(10, 10))
+            release.set()
+            for future in busy:
+                future.result()
+            # Jobs run in order: the dropped one was skipped by now.
+            images._executor.submit(int).result()
+        self.assertFormError(response, 'form', 'image',
+                             'The image took too long to process.')
+        reencode.assert_not_called()
+        self.assertFalse(Post.objects.exists())
+
+    def test_metadata_is_stripped(self):
+        """EXIF удаляется при перекодировании."""
+        buffer = io.BytesIO()
+        exif = Image.Exif()
+        exif[0x010F] = 'Camera maker'
+        Image.new('RGB', (8, 8), 'red').save(buffer, 'JPEG', exif=exif)
+        self.post_image(buffer.getvalue(), 'photo.jpg')
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertNotIn('exif', image.info)
+            self.assertEqual(image.size, (8, 8))
+
+    def test_image_info_is_recorded(self):
+        """Размеры, формат и превью картинки сохраняются при загрузке."""
+        buffer = io.BytesIO()
+        Image.new('RGB', (90, 40), 'red').save(buffer, 'JPEG')
+        self.post_image(buffer.getvalue(), 'photo.jpg')
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (90, 40))
+        self.assertEqual(post.image_format, 'JPEG')
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,')
+        )
+        self.assertLess(len(post.image_placeholder), 1024)
+        with mock.patch.object(ContentAddressedStorage, 'open',
+                               side_effect=AssertionError):
+            response = self.client.get(
+                reverse('posts:post_detail', args=(post.pk,))
+            )
+        self.assertContains(response, 'width="90" height="40"')
+        self.assertContains(response, post.image_placeholder)
+
+    def test_backfill_image_info(self):
+        """Команда досчитывает размеры картинок старых постов."""
+        post = Post.objects.create(
+            text='старый пост', author=self.user,
+            image=SimpleUploadedFile('image.png', png_claiming(1, 1))
+        )
+        self.assertIsNone(post.image_width)
+        call_command('backfill_image_info', stdout=io.StringIO())
+        version = post.version
+        post.refresh_from_db()
+        self.assertEqual(post.version, version + 1)
+        self.assertEqual((post.image_width, post.image_height), (1, 1))
+        self.assertEqual(post.image_format, 'PNG')
+        self.assertTrue(post.image_placeholder)
+
+    def test_backfill_batch_queries(self):
+        """Пачка постов досчитывается без запроса на каждый пост."""
+        group = Group.objects.create(title='Группа', slug='backfill')
+        for number in range(3):
+            Post.objects.create(
+                text='старый пост', author=self.user, group=group,
+                image=SimpleUploadedFile('image.png', png_claiming(1, 1))
+            )
+        # The batch, its UPDATE and the empty batch that ends the run.
+        with self.assertNumQueries(3):
+            call_command('backfill_image_info', stdout=io.StringIO())
+        self.assertFalse(Post.objects.filter(image_width=None).exists())
+
+    def test_refused_upload_is_not_buffered(self):
+        """Отклоненный файл не читается в память целиком."""
+        content = png_claiming(10, 10) + b'0' * 8 * 2 ** 20
+        request = RequestFactory().post('/', {
+            'image': SimpleUploadedFile('image.png', content),
+        })
+        del content
+        with mock.patch.object(images, 'MAX_SIZE', 2 ** 20):
+            tracemalloc.start()
+            try:
+                request.FILES
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        self.assertNotIn('image', request.FILES)
+        self.assertIn('image', request.upload_errors)
+        self.assertLess(peak, 2 * 2 ** 20)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentAddressedImageTests(TransactionTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(blobs, 'MIN_AGE', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = User.objects.create_user(username='uploader')
+
+    def create_post(self, content):
+        return Post.objects.create(
+            text='пост', author=self.user,
+            image=SimpleUploadedFile('image.png', content)
+        )
+
+    def test_identical_images_share_one_file(self):
+        """Одинаковые картинки хранятся один раз и удаляются последними."""
+        content = png_claiming(1, 1)
+        first, second = self.create_post(content), self.create_post(content)
+        self.assertEqual(first.image.name, second.image.name)
+        storage = first.image.storage
+        first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+        second.delete()
+        self.assertFalse(storage.exists(second.image.name))
+
+    def test_replaced_image_is_released(self):
+        """Замененная картинка без других ссылок удаляется."""
+        post = self.create_post(png_claiming(1, 1))
+        old_name = post.image.name
+        post.image = SimpleUploadedFile('image.png', png_claiming(2, 2))
+        post.save()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(post.image.storage.exists(old_name))
+
+    def test_recently_touched_image_is_kept(self):
+        """Недавно выданный файл не удаляется: его пост мог не сохраниться."""
+        content = png_claiming(1, 1)
+        post = self.create_post(content)
+        name = post.image.name
+        with mock.patch.object(blobs, 'MIN_AGE', 60 * 60):
+            post.delete()
+            self.assertTrue(post.image.storage.exists(name))
+            path = post.image.storage.path(name)
+            os.utime(path, (0, 0))
+            self.create_post(content).delete()
+        self.assertTrue(post.image.storage.exists(name))
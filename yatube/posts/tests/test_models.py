@@ -1,4 +1,5 @@
 # from django.contrib.auth import get_user_model
+from django.db.models import F
 from django.test import TestCase
 
 from ..models import Group, Post, User
@@ -28,6 +29,17 @@ class PostModelTest(TestCase):
         expected_object_name1 = post.text
         self.assertEqual(expected_object_name1, str(post))
 
+    def test_version_keeps_concurrent_bumps(self):
+        """Сохранение поста не затирает версию, поднятую после загрузки."""
+        post = Post.objects.get(pk=PostModelTest.post.pk)
+        version = post.version
+        Post.objects.filter(pk=post.pk).update(version=F('version') + 1)
+        post.text = 'Исправленный пост'
+        post.save()
+        self.assertEqual(post.version, version + 2)
+        post.refresh_from_db()
+        self.assertEqual(post.version, version + 2)
+
     def test_verbose_names(self):
         """проверяем корректность вербоуз имен"""
         field_verboses = {
@@ -0,0 +1,166 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.images import ImageFile
+
+from posts import thumbnails
+from posts.models import Post, User
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='auth')
+
+    def create_post(self, content=SMALL_GIF):
+        return Post.objects.create(
+            text='пост', author=self.user,
+            image=SimpleUploadedFile('small.gif', content, 'image/gif')
+        )
+
+    @mock.patch.object(thumbnails, 'enqueue')
+    def test_upload_queues_template_geometries(self, enqueue):
+        """Новая картинка ставится в очередь на все размеры шаблонов."""
+        post = self.create_post()
+        self.assertEqual(
+            [call.args for call in enqueue.call_args_list],
+            [(post.image.name, geometry, options)
+             for geometry, options in thumbnails.GEOMETRIES]
+        )
+        enqueue.reset_mock()
+        post.text = 'без новой картинки'
+        post.save()
+        enqueue.assert_not_called()
+
+    def test_missing_thumbnail_serves_original(self):
+        """Пока миниатюры нет, страница получает оригинал."""
+        post = self.create_post()
+        backend = thumbnails.PregeneratingBackend()
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            image = backend.get_thumbnail(post.image, '900x400', crop='left')
+        self.assertEqual(image.name, post.image.name)
+        enqueue.assert_called_once_with(post.image.name, '900x400',
+                                        {'crop': 'left'})
+
+    def test_job_runs_once(self):
+        """Одну и ту же миниатюру генерирует только один процесс."""
+        with mock.patch.object(thumbnails, '_get_executor') as executor:
+            thumbnails._submit('posts/small.gif', '900x400', {})
+            thumbnails._submit('posts/small.gif', '900x400', {})
+        executor.return_value.submit.assert_called_once()
+
+    def test_prefetch_resolves_page_in_one_lookup(self):
+        """Миниатюры страницы ищутся одним запросом, шаблон их не ищет."""
+        posts = [self.create_post(SMALL_GIF + bytes(number))
+                 for number in range(3)]
+        posts.append(self.create_post(SMALL_GIF))
+        backend = thumbnails.PregeneratingBackend()
+        geometry, options = thumbnails.GEOMETRIES[0]
+        for post in posts[:2]:
+            thumbnail = backend.thumbnail_file(ImageFile(post.image),
+                                               geometry, dict(options))
+            thumbnail.set_size((900, 400))
+            default.kvstore._set(thumbnail.key, thumbnail)
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.prefetch(posts)
+        with mock.patch.object(default.kvstore, 'get') as get, \
+                mock.patch.object(thumbnails, 'enqueue') as enqueue, \
+                self.assertNumQueries(0):
+            images = [backend.get_thumbnail(post.image, geometry, **options)
+                      for post in posts]
+        get.assert_not_called()
+        # The last post shares the first one's image and thumbnails.
+        self.assertEqual([images[index].x for index in (0, 1, 3)],
+                         [900, 900, 900])
+        self.assertEqual(images[2].name, posts[2].image.name)
+        enqueue.assert_called_once()
+
+    def test_picture_lists_ready_variants(self):
+        """<picture> перечисляет готовые варианты, иначе отдает оригинал."""
+        post = self.create_post()
+        with mock.patch.object(thumbnails, 'enqueue'):
+            self.assertEqual(thumbnails.picture(post.image)['image'],
+                             post.image)
+        backend = thumbnails.PregeneratingBackend()
+        source = ImageFile(post.image)
+        for _, geometry, options in thumbnails.VARIANTS:
+            thumbnail = backend.thumbnail_file(source, geometry,
+                                               dict(options))
+            thumbnail.set_size(tuple(map(int, geometry.split('x'))))
+            default.kvstore._set(thumbnail.key, thumbnail)
+        picture = thumbnails.picture(post.image)
+        self.assertEqual([source['type'] for source in picture['sources']],
+                         ['image/webp', 'image/jpeg'])
+        self.assertIn(' 360w, ', picture['sources'][0]['srcset'])
+        self.assertTrue(picture['image'].name.endswith('.jpg'))
+        self.assertEqual((picture['width'], picture['height']), (900, 400))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGarbageTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        user = User.objects.create_user(username='auth')
+        self.post = Post.objects.create(
+            text='пост', author=user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif')
+        )
+        self.storage = self.post.image.storage
+        self.orphan = self.storage.save(
+            'posts/orphan.gif', ContentFile(SMALL_GIF + b'\0')
+        )
+        self.thumbnail = ThumbnailBackend().get_thumbnail(self.post.image,
+                                                          '2x1')
+        self.stale = default.storage.save('cache/00/00/stale.jpg',
+                                          ContentFile(b'jpeg'))
+
+    def collect(self, *args):
+        call_command('collect_media_garbage', *args, stdout=io.StringIO())
+
+    def test_orphans_are_deleted(self):
+        """Удаляются только файлы, на которые никто не ссылается."""
+        self.collect('--min-age=0', '--batch-size=1')
+        self.assertTrue(self.storage.exists(self.post.image.name))
+        self.assertTrue(default.storage.exists(self.thumbnail.name))
+        self.assertFalse(self.storage.exists(self.orphan))
+        self.assertFalse(default.storage.exists(self.stale))
+
+    def test_dry_run_and_recent_files_are_kept(self):
+        """Пробный запуск и свежие файлы ничего не удаляют."""
+        self.collect('--min-age=0', '--dry-run')
+        self.collect()
+        self.assertTrue(self.storage.exists(self.orphan))
+        self.assertTrue(default.storage.exists(self.stale))
@@ -1,14 +1,22 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase, override_settings
-from django.urls import reverse
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 
-from posts.models import Comment, Follow, Group, Post, User
+from core import singleflight
+from core.counters import make_key
+from core.testing import QueryBudgetMixin, QueryPlanMixin
+from posts import counts, stats
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry, User,
+                          UserStats)
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
@@ -54,6 +62,11 @@ class TaskViewTests(TestCase):
 
         cache.clear()
         cls.post = Post.objects.bulk_create(test_posts)
+        # Identical uploads share one content-addressed file.
+        cls.image_name = cls.post[0].image.name
+        # bulk_create skips signals, so the counters are rebuilt by hand.
+        stats.recount_groups([cls.group1.pk])
+        stats.recount_users([cls.user.pk])
 
     @classmethod
     def tearDownClass(cls):
@@ -61,6 +74,9 @@ class TaskViewTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        # Feed fragments are cached per scope generation, and bulk_create
+        # in setUpClass sends no signals to bump them.
+        cache.clear()
         self.guest_client = Client()
         # Создаем пользователя
         self.user = User.objects.create_user(username='HasNoName')
@@ -100,7 +116,7 @@ class TaskViewTests(TestCase):
         first_object = response.context['page_obj'][0]
         self.assertEqual(first_object.text, 'Тестовый пост 11')
         self.assertEqual(first_object.author.username, 'auth')
-        self.assertEqual(first_object.image, 'posts/small11.gif')
+        self.assertEqual(first_object.image, self.image_name)
 
     def test_profile_page_context(self):
         response = (
@@ -115,7 +131,7 @@ class TaskViewTests(TestCase):
         first_object = response.context['page_obj'][0]
         self.assertEqual(first_object.text, 'Тестовый пост 11')
         self.assertEqual(first_object.author.username, 'auth')
-        self.assertEqual(first_object.image, 'posts/small11.gif')
+        self.assertEqual(first_object.image, self.image_name)
 
     def test_group_page_context(self):
         response = (
@@ -133,7 +149,7 @@ class TaskViewTests(TestCase):
         first_object = response.context['page_obj'][0]
         self.assertEqual(first_object.text, 'Тестовый пост 11')
         self.assertEqual(first_object.author.username, 'auth')
-        self.assertEqual(first_object.image, 'posts/small11.gif')
+        self.assertEqual(first_object.image, self.image_name)
 
     def test_create_page_field_types(self):
         response = self.authorized_client.get(reverse('posts:post_create'))
@@ -177,7 +193,7 @@ class TaskViewTests(TestCase):
             post_cntxt.text: 'Тестовый пост 0',
             post_cntxt.author.username: 'auth',
             post_cntxt.group.title: 'Тестовая группа',
-            post_cntxt.image: 'posts/small0.gif'
+            post_cntxt.image: self.image_name
         }
         for post_field, meaning in post_fields.items():
             with self.subTest(post_field=post_field):
@@ -207,6 +223,111 @@ class TaskViewTests(TestCase):
                 response = self.authorized_client.get(page)
                 self.assertEqual(len(response.context['page_obj']), 2)
 
+    def test_cursor_pages_match_offset_pages(self):
+        url = reverse('posts:index')
+        first_page = self.authorized_client.get(url).context['page_obj']
+        response = self.authorized_client.get(
+            url, {'cursor': first_page.next_cursor}
+        )
+        cursor_page = response.context['page_obj']
+        offset_page = self.authorized_client.get(
+            url, {'page': 2}
+        ).context['page_obj']
+        self.assertEqual(cursor_page.number, 2)
+        self.assertEqual(list(cursor_page), list(offset_page))
+        response = self.authorized_client.get(
+            url, {'cursor': cursor_page.previous_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), list(first_page))
+
+    def test_last_page_cursor(self):
+        url = reverse('posts:index')
+        paginator = self.authorized_client.get(
+            url
+        ).context['page_obj'].paginator
+        response = self.authorized_client.get(
+            url, {'cursor': paginator.last_cursor}
+        )
+        last_page = response.context['page_obj']
+        self.assertEqual(last_page.number, 2)
+        self.assertEqual(list(last_page), list(Post.objects.all()[10:]))
+
+    def test_invalid_cursor_falls_back_to_page_number(self):
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': 'broken', 'page': 2}
+        )
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+    def test_feed_count_is_cached_and_adjusted(self):
+        cache.clear()
+        url = reverse('posts:index')
+        paginator = self.guest_client.get(url).context['page_obj'].paginator
+        self.assertEqual((paginator.count, paginator.approximate), (12, False))
+        Post.objects.create(text='ещё один пост', author=self.user2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertFalse([query for query in queries
+                          if 'COUNT(' in query['sql']])
+
+    def test_cold_count_is_estimated(self):
+        cache.clear()
+        url = reverse('posts:index')
+        # Another request is counting the scope exactly.
+        singleflight.acquire(make_key(counts.all_scope()))
+        with mock.patch('core.counters.ESTIMATE_LIMIT', 5):
+            page_obj = self.guest_client.get(url).context['page_obj']
+            self.assertTrue(page_obj.paginator.approximate)
+            self.assertTrue(page_obj.has_next())
+            response = self.guest_client.get(
+                url, {'cursor': page_obj.next_cursor}
+            )
+        self.assertEqual(len(response.context['page_obj']), 2)
+
+    def test_large_cold_count_is_counted_once(self):
+        cache.clear()
+        url = reverse('posts:index')
+        with mock.patch('core.counters.ESTIMATE_LIMIT', 5):
+            paginator = self.guest_client.get(
+                url).context['page_obj'].paginator
+            self.assertEqual((paginator.count, paginator.approximate),
+                             (12, False))
+            Post.objects.create(text='ещё один пост', author=self.user2)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.guest_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 13)
+        self.assertFalse([query for query in queries
+                          if 'COUNT(' in query['sql']])
+
+    def test_counters_follow_creation_and_deletion(self):
+        post = Post.objects.create(text='счётчики', author=self.user2,
+                                   group=self.group2)
+        Comment.objects.create(post=post, author=self.user, text='к')
+        Follow.objects.create(user=self.user, author=self.user2)
+        self.user2.stats.refresh_from_db()
+        self.group2.refresh_from_db()
+        post.refresh_from_db()
+        self.assertEqual(self.user2.stats.posts_count, 13)
+        self.assertEqual(self.user2.stats.followers_count, 1)
+        self.assertEqual(self.group2.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        post.group = self.group1
+        post.save()
+        self.group2.refresh_from_db()
+        self.assertEqual(self.group2.posts_count, 0)
+        post.delete()
+        self.user2.stats.refresh_from_db()
+        self.assertEqual(self.user2.stats.posts_count, 12)
+
+    def test_deleting_author_drops_stats(self):
+        author = User.objects.create_user(username='deleted')
+        post = Post.objects.create(text='пост', author=author)
+        Comment.objects.create(post=post, author=author, text='к')
+        Follow.objects.create(user=self.user, author=author)
+        Follow.objects.create(user=author, author=self.user)
+        author.delete()
+        self.assertFalse(UserStats.objects.filter(pk=author.pk).exists())
+
     def test_post_creation(self):
         cache.clear()
         url = reverse('posts:post_create')
@@ -250,15 +371,92 @@ class TaskViewTests(TestCase):
     def test_cache(self):
         url = reverse('posts:post_create')
         self.author.post(url, {'text': 'пост проверки кэша', 'group': 2})
-        cache.clear()
         page = reverse('posts:index')
         response1 = self.authorized_client.get(page)
-        Post.objects.get(text='пост проверки кэша').delete()
+        # update() sends no signals, so the cached fragment is kept.
+        Post.objects.filter(text='пост проверки кэша').update(text='тихо')
         response2 = self.authorized_client.get(page)
-        self.assertEqual(response1.content, response2.content)
-        cache.clear()
+        self.assertEqual(self.cached_block(response1),
+                         self.cached_block(response2))
+        Post.objects.get(text='тихо').delete()
         response3 = self.authorized_client.get(page)
-        self.assertNotEqual(response1.content, response3.content)
+        self.assertNotEqual(self.cached_block(response1),
+                            self.cached_block(response3))
+        self.assertNotIn('тихо', response3.content.decode())
+
+    def test_follow_feed_cache_is_per_reader(self):
+        Follow.objects.create(user=self.user, author=self.user2)
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        self.assertIn('Тестовый пост 11', response.content.decode())
+        response = self.author.get(reverse('posts:follow_index'))
+        self.assertNotIn('Тестовый пост 11', response.content.decode())
+
+    def test_anonymous_page_cache(self):
+        page = reverse('posts:group', kwargs={'slug': 'test-slug'})
+        response1 = self.guest_client.get(page)
+        with self.assertNumQueries(0):
+            response2 = self.guest_client.get(page)
+        self.assertEqual(response1.content, response2.content)
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.get(page)
+        self.assertTrue(queries)
+        Post.objects.create(text='пост для сброса', author=self.user2,
+                            group=self.group1)
+        response3 = self.guest_client.get(page)
+        self.assertIn('пост для сброса', response3.content.decode())
+
+    def test_unchanged_page_is_not_modified(self):
+        """Неизмененная страница отвечает 304 без рендера шаблона."""
+        page = reverse('posts:group', kwargs={'slug': 'test-slug'})
+        etag = self.guest_client.get(page)['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse(response.templates)
+        Post.objects.create(text='новый пост', author=self.user2,
+                            group=self.group1)
+        response = self.guest_client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_is_per_viewer(self):
+        """ETag ленты подписок и профиля зависит от читателя."""
+        page = reverse('posts:follow_index')
+        etag = self.authorized_client.get(page)['ETag']
+        self.assertNotEqual(self.author.get(page)['ETag'], etag)
+        self.assertEqual(self.authorized_client.get(
+            page, HTTP_IF_NONE_MATCH=etag
+        ).status_code, 304)
+        Follow.objects.create(user=self.user, author=self.user2)
+        self.assertEqual(self.authorized_client.get(
+            page, HTTP_IF_NONE_MATCH=etag
+        ).status_code, 200)
+        page = reverse('posts:profile', kwargs={'username': 'auth'})
+        etag = self.guest_client.get(page)['ETag']
+        self.assertNotEqual(self.authorized_client.get(page)['ETag'], etag)
+
+    def test_etag_changes_with_csrf_token(self):
+        """После повторного входа страница с формой отдается заново."""
+        page = reverse('posts:post_detail',
+                       kwargs={'post_id': Post.objects.first().pk})
+        # The first visit sets the CSRF cookie the later ones send.
+        self.authorized_client.get(page)
+        response = self.authorized_client.get(page)
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        etag = response['ETag']
+        self.assertEqual(self.authorized_client.get(
+            page, HTTP_IF_NONE_MATCH=etag
+        ).status_code, 304)
+        self.authorized_client.logout()
+        self.authorized_client.force_login(self.user)
+        self.assertEqual(self.authorized_client.get(
+            page, HTTP_IF_NONE_MATCH=etag
+        ).status_code, 200)
+
+    @staticmethod
+    def cached_block(response):
+        content = response.content.decode()
+        return content[content.index('<div2>'):content.index('</div2>')]
 
 
 class FollowViewTests(TestCase):
@@ -305,3 +503,87 @@ class FollowViewTests(TestCase):
         self.follower.get(page)
         self.assertFalse(Follow.objects.filter(user=self.user1,
                                                author=self.user1).exists())
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        post = Post.objects.create(text='пост до подписки', author=self.user2)
+        Follow.objects.all().delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.follower.get(
+            reverse('posts:profile_follow', kwargs={'username': 'auth'})
+        )
+        self.assertTrue(TimelineEntry.objects.filter(user=self.user4,
+                                                     post=post).exists())
+        self.follower.get(
+            reverse('posts:profile_unfollow', kwargs={'username': 'auth'})
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user4).exists()
+        )
+
+    def test_pulled_author_reaches_feed_on_read(self):
+        with mock.patch('posts.timeline.FANOUT_LIMIT', 0):
+            post = Post.objects.create(text='пост звезды', author=self.user2)
+            self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+            response = self.follower.get(reverse('posts:follow_index'))
+        self.assertIn(post, response.context['page_obj'])
+
+
+class QueryBudgetTests(QueryBudgetMixin, QueryPlanMixin, TestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader')
+        self.client.force_login(self.reader)
+        self.group = Group.objects.create(title='Группа', slug='budget')
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(text='пост', author=self.author,
+                                        group=self.group)
+        self.add_data()
+
+    def add_data(self, count=3):
+        for number in range(count):
+            author = User.objects.create_user(
+                username=f'author{User.objects.count()}',
+                first_name='Имя', last_name='Фамилия'
+            )
+            Follow.objects.create(user=self.reader, author=author)
+            Post.objects.create(text='пост', author=author, group=self.group)
+            Post.objects.create(text='пост', author=self.author,
+                                group=self.group)
+            Comment.objects.create(post=self.post, author=author,
+                                   text='комментарий')
+
+    def urls(self):
+        return (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'budget'}),
+            reverse('posts:profile', kwargs={'username': 'author'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        )
+
+    def test_views_fit_their_query_budget(self):
+        """Число запросов страниц не растет вместе с данными."""
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, self.add_data)
+
+    def test_follow_feed_budget_with_pulled_authors(self):
+        """Подтягивание постов популярных авторов не зависит от их числа."""
+        url = reverse('posts:follow_index')
+        queries = []
+        with mock.patch('posts.timeline.FANOUT_LIMIT', 0):
+            for count in (1, 5):
+                self.add_data(count)
+                queries.append(self.count_queries(url))
+        self.assertEqual(queries[0], queries[1])
+        self.assertLessEqual(queries[0], resolve(url).func.query_budget)
+
+    def test_views_use_indexes(self):
+        """Запросы страниц не сканируют таблицы и не сортируют заново."""
+        second_pages = []
+        for url in self.urls():
+            response = self.client.get(url)
+            page_obj = response.context.get('page_obj')
+            if page_obj is not None and page_obj.next_cursor:
+                second_pages.append(f'{url}?cursor={page_obj.next_cursor}')
+        for url in (*self.urls(), *second_pages):
+            self.assertIndexedQueries(url)
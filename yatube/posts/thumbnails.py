@@ -0,0 +1,244 @@
+"""Thumbnails generated off the request path.
+
+``PregeneratingBackend`` replaces sorl-thumbnail's backend. When a page
+asks for a thumbnail that does not exist yet, it serves the original
+image and queues the resize on a local process pool instead of decoding
+and resizing inside the request. New and edited posts queue every
+geometry the templates use as soon as they are committed. A job is
+claimed with ``cache.add`` on the shared cache, so only one worker
+process on the host runs it.
+"""
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+
+
+# Responsive ladder of post images: every width in every format, all
+# cropped to the 9:4 frame of the original 900x400 thumbnail. Formats are
+# listed in order of preference for <picture>.
+WIDTHS = (360, 640, 900)
+FORMATS = (('WEBP', 'image/webp'), ('JPEG', 'image/jpeg'))
+VARIANTS = tuple(
+    (mime_type, f'{width}x{width * 4 // 9}',
+     {'crop': 'left', 'upscale': True, 'format': image_format})
+    for image_format, mime_type in FORMATS for width in WIDTHS
+)
+# Every thumbnail geometry used by the post templates.
+GEOMETRIES = tuple((geometry, options) for _, geometry, options in VARIANTS)
+WORKERS = getattr(settings, 'THUMBNAIL_WORKERS', 2)
+# A claimed job that has not finished by then may be queued again.
+JOB_TIMEOUT = getattr(settings, 'THUMBNAIL_JOB_TIMEOUT', 60 * 5)
+
+_executor = None
+
+
+def _init_worker():
+    django.setup()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def _generate(name, geometry, options):
+    # Pool workers unpickle this module before django.setup() has run,
+    # so nothing touching the app registry is imported at module level.
+    from . import invalidation
+    from .models import Post
+
+    try:
+        ThumbnailBackend().get_thumbnail(name, geometry, **options)
+    finally:
+        cache.delete(_job_key(name, geometry, options))
+    # Cached cards and pages still point at the original image.
+    Post.objects.filter(image=name).update(version=F('version') + 1)
+    for post in Post.objects.filter(image=name).select_related('group',
+                                                               'author'):
+        invalidation.post_changed(post)
+
+
+def _job_key(name, geometry, options):
+    options = ','.join(f'{key}={options[key]}' for key in sorted(options))
+    digest = hashlib.md5(f'{name}:{geometry}:{options}'.encode()).hexdigest()
+    return f'thumbnail-job:{digest}'
+
+
+def _submit(name, geometry, options):
+    global _executor
+    key = _job_key(name, geometry, options)
+    if not cache.add(key, 1, JOB_TIMEOUT):
+        return
+    try:
+        _get_executor().submit(_generate, name, geometry, options)
+    except BrokenProcessPool:
+        # A crashed worker breaks the whole pool; the next job gets a new
+        # one and this thumbnail is claimed again on its next request.
+        _executor = None
+        cache.delete(key)
+
+
+def enqueue(name, geometry, options):
+    """Generate a thumbnail in the pool once the transaction commits."""
+    transaction.on_commit(lambda: _submit(name, geometry, dict(options)))
+
+
+def pregenerate(post):
+    """Queue every template geometry of the post's image."""
+    if post.image:
+        for geometry, options in GEOMETRIES:
+            enqueue(post.image.name, geometry, options)
+
+
+def prefetch(posts, geometries=GEOMETRIES):
+    """Look up the thumbnails of a page of posts in one round trip.
+
+    Results are kept on each post, so the backend answers the page's
+    ``{% thumbnail %}`` tags from a dict. Keys missing from the cache are
+    read from sorl's database table with a single query and cached,
+    including the misses, as sorl's own key-value store does.
+    """
+    # Imported here for the same reason as in _generate.
+    from sorl.thumbnail.kvstores.cached_db_kvstore import EMPTY_VALUE
+    from sorl.thumbnail.models import KVStore as KVStoreModel
+
+    backend = PregeneratingBackend()
+    wanted = {}
+    for post in posts:
+        if not post.image:
+            continue
+        post._thumbnails = {}
+        source = ImageFile(post.image)
+        for geometry, options in geometries:
+            thumbnail = backend.thumbnail_file(source, geometry, dict(options))
+            # Posts with the same image share its thumbnails.
+            wanted.setdefault(add_prefix(thumbnail.key), []).append(
+                (post, thumbnail.name)
+            )
+    if not wanted:
+        return
+    store = default.kvstore
+    found = store.cache.get_many(wanted)
+    missing = [key for key in wanted if key not in found]
+    if missing:
+        rows = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        fetched = {key: rows.get(key, EMPTY_VALUE) for key in missing}
+        store.cache.set_many(fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(fetched)
+    for key, references in wanted.items():
+        value = found[key]
+        thumbnail = (
+            None if value == EMPTY_VALUE else deserialize_image_file(value)
+        )
+        for post, name in references:
+            post._thumbnails[name] = thumbnail
+
+
+def picture(image):
+    """``<picture>`` sources for ``image`` from its ready variants.
+
+    Returns the ``srcset`` of each format and the fallback ``<img>``: the
+    largest ready JPEG, or the original image while no variant has been
+    generated yet.
+    """
+    backend = PregeneratingBackend()
+    sources = {}
+    fallback = None
+    for mime_type, geometry, options in VARIANTS:
+        thumbnail = backend.get_thumbnail(image, geometry, **options)
+        if thumbnail.name == image.name:
+            continue
+        sources.setdefault(mime_type, []).append(thumbnail)
+        if mime_type == 'image/jpeg':
+            fallback = thumbnail
+    return {
+        'sources': [
+            {'type': mime_type, 'srcset': ', '.join(
+                f'{variant.url} {variant.x}w' for variant in variants
+            )}
+            for mime_type, variants in sources.items()
+        ],
+        'image': fallback or image,
+        'width': fallback.x if fallback else None,
+        'height': fallback.y if fallback else None,
+    }
+
+
+def post_picture(post):
+    """Context of posts/includes/picture.html for ``post``.
+
+    Until a variant is ready, the original is sized from the dimensions
+    stored on the post; either way its placeholder shows while it loads.
+    """
+    if not post.image:
+        return {}
+    context = picture(post.image)
+    context['src'] = context['image'].url
+    if context['width'] is None and post.image_width:
+        context['width'] = post.image_width
+        context['height'] = post.image_height
+    context['placeholder'] = post.image_placeholder
+    return context
+
+
+class PregeneratingBackend(ThumbnailBackend):
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        source = ImageFile(file_)
+        requested = dict(options)
+        thumbnail = self.thumbnail_file(source, geometry_string, options)
+        prefetched = getattr(getattr(file_, 'instance', None),
+                             '_thumbnails', {})
+        if thumbnail.name in prefetched:
+            cached = prefetched[thumbnail.name]
+        else:
+            cached = default.kvstore.get(thumbnail)
+        if cached:
+            return cached
+        enqueue(source.name, geometry_string, requested)
+        return source
+
+    def thumbnail_file(self, source, geometry_string, options):
+        """The thumbnail's ImageFile, without touching storage or the store.
+        """
+        return ImageFile(
+            self._get_thumbnail_filename(
+                source, geometry_string, self._full_options(source, options)
+            ),
+            default.storage
+        )
+
+    def _full_options(self, source, options):
+        # Mirrors the option defaults of ThumbnailBackend.get_thumbnail,
+        # which decide the thumbnail's file name.
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        return options
@@ -0,0 +1,110 @@
+"""Fan-out-on-write home timeline for the follow feed.
+
+New posts are copied into the timeline of every follower of their author,
+so ``follow_index`` reads one index range of ``TimelineEntry`` instead of
+joining through ``Follow``. Authors followed by more than
+``TIMELINE_FANOUT_LIMIT`` users are not fanned out: their posts are pulled
+into a reader's timeline when that reader opens the feed.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import F, Max, Q
+
+from . import counts
+from .models import Follow, Post, TimelineEntry, UserStats
+
+
+FANOUT_LIMIT = getattr(settings, 'TIMELINE_FANOUT_LIMIT', 1000)
+BACKFILL_SIZE = getattr(settings, 'TIMELINE_BACKFILL_SIZE', 1000)
+BATCH_SIZE = 500
+
+
+def is_pulled(author_id):
+    """Whether posts of the author are merged on read, not on write."""
+    return UserStats.objects.filter(
+        user_id=author_id, followers_count__gt=FANOUT_LIMIT
+    ).exists()
+
+
+def _insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """Copy a new post into the timelines of its author's followers."""
+    if is_pulled(post.author_id):
+        return
+    readers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True).iterator()
+    while True:
+        batch = list(islice(readers, BATCH_SIZE))
+        if not batch:
+            break
+        _insert([TimelineEntry(user_id=reader, post_id=post.pk,
+                               pub_date=post.pub_date) for reader in batch])
+        counts.feeds_changed(batch)
+
+
+def _copy(user_id, posts):
+    rows = list(posts.values_list('pk', 'pub_date')[:BACKFILL_SIZE])
+    if rows:
+        _insert(TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in rows)
+        counts.feeds_changed([user_id])
+
+
+def backfill(user_id, author_id, since=None):
+    """Copy the latest posts of the author into the reader's timeline."""
+    posts = Post.objects.filter(author_id=author_id)
+    if since is not None:
+        posts = posts.filter(pub_date__gt=since)
+    _copy(user_id, posts)
+
+
+def prune(user_id, author_id):
+    """Drop posts of an unfollowed author from the reader's timeline."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+    counts.feeds_changed([user_id])
+
+
+def pull(user_id):
+    """Merge new posts of fan-out-on-read authors into the timeline.
+
+    Takes the same queries however many such authors the reader follows:
+    one to find them, one for the newest entry of each in the timeline,
+    one for their newer posts and the inserts of those, if any.
+    """
+    pulled = list(Follow.objects.filter(
+        user_id=user_id, author__stats__followers_count__gt=FANOUT_LIMIT
+    ).values_list('author_id', flat=True))
+    if not pulled:
+        return
+    latest = dict(TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id__in=pulled
+    ).order_by().values_list('post__author_id').annotate(Max('pub_date')))
+    condition = Q()
+    for author_id in pulled:
+        step = Q(author_id=author_id)
+        if author_id in latest:
+            step &= Q(pub_date__gt=latest[author_id])
+        condition |= step
+    _copy(user_id, Post.objects.filter(condition))
+
+
+def feed(user_id):
+    """Posts of the reader's timeline, newest first.
+
+    Ordered by the timeline columns so that pagination walks the
+    ``(user, -pub_date, -post)`` index.
+    """
+    pull(user_id)
+    return Post.objects.filter(timeline_entries__user_id=user_id).annotate(
+        feed_date=F('timeline_entries__pub_date'),
+        feed_post=F('timeline_entries__post_id'),
+    ).order_by('-feed_date', '-feed_post')
@@ -1,42 +1,71 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
 
+from core.counters import KnownCount, ScopedCount
+from core.decorators import (cache_public_page, generation_etag,
+                             query_budget)
+from core.paginators import InvalidCursor, KeysetPaginator
+from core.uploads import add_upload_errors
+from . import counts, invalidation, stats, thumbnails, timeline
 from .forms import CommentForm, PostForm
 from .models import Comment, Follow, Group, Post, User
 
 
 POST_NUMBER = 10
-
-
-def do_pagination(request, posts):
-    paginator = Paginator(posts, POST_NUMBER)
+# Related objects every post listing template reads.
+LISTING_RELATED = ('author', 'group')
+
+
+def do_pagination(request, posts, count=None):
+    paginator = KeysetPaginator(posts, POST_NUMBER, count=count)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            return paginator.get_cursor_page(cursor)
+        except InvalidCursor:
+            pass
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+@query_budget(5)
+@generation_etag(invalidation.index_scopes)
+@cache_public_page(invalidation.index_scopes)
 def index(request):
-    posts = Post.objects.all()
-    page_obj = do_pagination(request, posts)
+    posts = Post.objects.select_related(*LISTING_RELATED)
+    page_obj = do_pagination(
+        request, posts, ScopedCount(counts.all_scope(), posts)
+    )
     template = 'posts/index.html'
-    context = {'page_obj': page_obj}
+    context = {'page_obj': page_obj,
+               'cache_scopes': invalidation.index_scopes()}
     return render(request, template, context)
 
 
+@query_budget(5)
+@generation_etag(invalidation.group_scopes)
+@cache_public_page(invalidation.group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = Post.objects.filter(group=group).select_related('group').all()
+    posts = group.posts.select_related(*LISTING_RELATED)
     template = 'posts/group_list.html'
-    page_obj = do_pagination(request, posts)
+    page_obj = do_pagination(request, posts, KnownCount(group.posts_count))
     context = {'group': group,
-               'page_obj': page_obj, }
+               'page_obj': page_obj,
+               'cache_scopes': invalidation.group_scopes(slug)}
     return render(request, template, context)
 
 
+@query_budget(6)
+@generation_etag(invalidation.profile_scopes,
+                 invalidation.profile_viewer_scopes)
+@cache_public_page(invalidation.profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = do_pagination(request, posts)
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    posts = author.posts.select_related(*LISTING_RELATED)
+    page_obj = do_pagination(request, posts,
+                             KnownCount(stats.of(author).posts_count))
     template = 'posts/profile.html'
     following = (request.user.is_authenticated and Follow.objects.filter(
         user=request.user,
@@ -45,14 +74,23 @@ def profile(request, username):
 
     context = {'page_obj': page_obj,
                'author': author,
-               'following': following}
+               'following': following,
+               'cache_scopes': invalidation.profile_scopes(username)}
     return render(request, template, context)
 
 
+@query_budget(5)
+@generation_etag(invalidation.post_detail_scopes)
+@cache_public_page(invalidation.post_detail_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
+    thumbnails.prefetch([post])
     form = CommentForm(request.POST or None)
-    comments = Comment.objects.filter(post_id=post_id)
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).order_by('pub_date')
     template = 'posts/post_detail.html'
     context = {'post': post,
                'form': form,
@@ -72,6 +110,7 @@ def post_detail(request, post_id):
 def post_create(request):
     form = PostForm(request.POST or None,
                     files=request.FILES or None)
+    add_upload_errors(request, form)
 
     template = 'posts/create_post.html'
     context = {'form': form}
@@ -94,6 +133,7 @@ def post_edit(request, post_id):
     form = PostForm(request.POST or None,
                     files=request.FILES or None,
                     instance=post)
+    add_upload_errors(request, form)
     template = 'posts/create_post.html'
     context = {'form': form, 'post': post, 'is_edit': True}
     if form.is_valid():
@@ -116,12 +156,19 @@ def add_comment(request, post_id):
     return redirect('posts:post_detail', post_id=post_id)
 
 
+# Covers timeline.pull reading and copying new posts of fan-out-on-read
+# authors, which costs the same queries however many the reader follows.
+@query_budget(8)
 @login_required
+@generation_etag(viewer_scopes=invalidation.follow_scopes)
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = do_pagination(request, posts)
+    posts = timeline.feed(request.user.pk).select_related(*LISTING_RELATED)
+    page_obj = do_pagination(
+        request, posts, ScopedCount(counts.feed_scope(request.user.pk), posts)
+    )
     template = 'posts/follow.html'
-    context = {'page_obj': page_obj}
+    context = {'page_obj': page_obj,
+               'cache_scopes': invalidation.follow_scopes(request.user.pk)}
     return render(request, template, context)
 
 
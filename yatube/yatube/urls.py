@@ -1,7 +1,8 @@
 from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
-from django.conf.urls.static import static
+
+from core import views as core_views
 
 
 urlpatterns = [
@@ -10,6 +11,11 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('posts.api_urls', namespace='api')),
+    path(f'{settings.MEDIA_URL.lstrip("/")}<path:path>', core_views.media,
+         name='media'),
+    path(f'{settings.STATIC_URL.lstrip("/")}<path:path>',
+         core_views.static, name='static'),
 ]
 
 handler404 = 'core.views.page_not_found'
@@ -19,7 +25,4 @@ handler403 = 'core.views.permission_denied'
 if settings.DEBUG:
     import debug_toolbar
 
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += (path('__debug__/', include(debug_toolbar.urls)),)